@@ -1,54 +1,71 @@
-from django.db.models import Q
+from django.db.models import Max, Q
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject, new_method_proxy
 
 from timepiece import utils
+from timepiece.utils.cache import QUICK_CLOCK_IN, get_user_value
 from timepiece.crm.forms import QuickSearchForm
 
 from timepiece.crm.models import Project
-from timepiece.entries.models import Entry
+
+
+# The number of recent work projects to display in the navigation.
+QUICK_CLOCK_IN_PROJECTS = 10
+
+
+class LazyList(SimpleLazyObject):
+    """A list which is not built until it is first used, e.g. in a template."""
+    __iter__ = new_method_proxy(iter)
 
 
 def quick_search(request):
     return {
-        'quick_search_form': QuickSearchForm(),
+        'quick_search_form': SimpleLazyObject(QuickSearchForm),
     }
 
 
 def quick_clock_in(request):
-    user = request.user
-    work_projects = []
-    leave_projects = []
-
-    if user.is_authenticated() and user.is_active:
-        # Display all active paid leave projects that the user is assigned to.
-        leave_ids = utils.get_setting('TIMEPIECE_PAID_LEAVE_PROJECTS').values()
-        lq = Q(users=user) & Q(id__in=leave_ids)
-        leave_projects = Project.trackable.filter(lq).order_by('name')
-
-        # Get all projects this user has clocked in to.
-        entries = Entry.objects.filter(user=user)
-        project_ids = list(entries.values_list('project', flat=True))
-
-        # Narrow to projects which can still be clocked in to.
-        pq = Q(id__in=project_ids)
-        valid_projects = Project.trackable.filter(pq).exclude(id__in=leave_ids)
-        valid_ids = list(valid_projects.values_list('id', flat=True))
-
-        # Display the 10 projects this user most recently clocked into.
-        work_ids = []
-        for i in project_ids:
-            if len(work_ids) > 10:
-                break
-            if i in valid_ids and i not in work_ids:
-                work_ids.append(i)
-        work_projects = [valid_projects.get(pk=i) for i in work_ids]
-
+    # Navigation is not rendered for every response (e.g. AJAX, CSV exports
+    # and redirects), so wait until a template uses the projects.
+    projects = SimpleLazyObject(lambda: get_user_projects(request.user))
     return {
-        'leave_projects': leave_projects,
-        'work_projects': work_projects,
+        'leave_projects': LazyList(lambda: projects[1]),
+        'work_projects': LazyList(lambda: projects[0]),
     }
 
 
+def get_user_projects(user):
+    """Returns the user's cached (work projects, leave projects)."""
+    if not (user.is_authenticated() and user.is_active):
+        return [], []
+    return get_user_value(
+        QUICK_CLOCK_IN, user.pk, lambda: get_quick_clock_in_projects(user))
+
+
+def get_quick_clock_in_projects(user):
+    """
+    Returns the recent work projects and the paid leave projects that the
+    user can clock in to.
+    """
+    # Display all active paid leave projects that the user is assigned to.
+    leave_ids = utils.get_setting('TIMEPIECE_PAID_LEAVE_PROJECTS').values()
+    lq = Q(users=user) & Q(id__in=leave_ids)
+    leave_projects = Project.trackable.filter(lq).order_by('name')
+    leave_projects = leave_projects.select_related('business')
+
+    # Display the projects this user most recently clocked into which can
+    # still be clocked in to.
+    work_projects = Project.trackable.filter(entries__user=user)
+    work_projects = work_projects.exclude(id__in=leave_ids)
+    work_projects = work_projects.annotate(
+        last_start_time=Max('entries__start_time'))
+    work_projects = work_projects.order_by('-last_start_time', 'pk')
+    work_projects = work_projects.select_related('business')
+    work_projects = work_projects[:QUICK_CLOCK_IN_PROJECTS]
+
+    return list(work_projects), list(leave_projects)
+
+
 def extra_settings(request):
     return {
         'COMPRESS_ENABLED': settings.COMPRESS_ENABLED,
@@ -9,8 +9,8 @@ from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
 from django.core.urlresolvers import reverse
 from django.db import models
-from django.db.models import Sum
-from django.db.models.expressions import F, Func, Value
+from django.db.models import Case, ExpressionWrapper, Q, Sum, When
+from django.db.models.expressions import F, Func, RawSQL, Value
 from django.template.loader import render_to_string
 from django.utils.encoding import python_2_unicode_compatible
 
@@ -18,6 +18,52 @@ from timepiece import utils
 from timepiece.entries.models import Entry
 
 
+class ProjectContractQuerySet(models.query.QuerySet):
+
+    def with_hours(self):
+        """
+        Annotates the contracted, pending, assigned, billable worked and
+        non-billable worked hours of each contract, so that reading them from
+        any number of contracts costs a single query.
+
+        The annotations fill the attributes in which the contract caches
+        those hours.
+        """
+        entries = 'projects__entries__'
+        contractQ = Q(**{
+            entries + 'start_time__gte': F('start_date'),
+            entries + 'end_time__lt': ExpressionWrapper(
+                F('end_date') + datetime.timedelta(days=1),
+                output_field=models.DateTimeField()),
+        })
+
+        def _sum_entries(billable):
+            billableQ = Q(**{entries + 'activity__billable': billable})
+            return Sum(Case(
+                When(contractQ & billableQ, then=entries + 'hours'),
+                output_field=models.DecimalField()))
+
+        def _sum_subquery(model, column, where='', params=()):
+            sql = 'SELECT COALESCE(SUM({column}), 0) FROM {table} ' \
+                  'WHERE contract_id = {contracts}.id{where}'.format(
+                      column=column, table=model._meta.db_table,
+                      contracts=self.model._meta.db_table, where=where)
+            return RawSQL(sql, params, output_field=models.DecimalField())
+
+        # Entries are summed through a join, while the other hours come from
+        # subqueries so that their rows are not multiplied by the entries.
+        status = ' AND status = %s'
+        return self.annotate(
+            _contracted=_sum_subquery(
+                ContractHour, 'hours', status, (ContractHour.APPROVED_STATUS,)),
+            _pending=_sum_subquery(
+                ContractHour, 'hours', status, (ContractHour.PENDING_STATUS,)),
+            _assigned=_sum_subquery(ContractAssignment, 'num_hours'),
+            _worked=_sum_entries(True),
+            _nb_worked=_sum_entries(False),
+        )
+
+
 @python_2_unicode_compatible
 class ProjectContract(models.Model):
     STATUS_UPCOMING = 'upcoming'
@@ -47,6 +93,8 @@ class ProjectContract(models.Model):
         choices=CONTRACT_STATUS.items(), default=STATUS_UPCOMING, max_length=32)
     type = models.IntegerField(choices=PROJECT_TYPE.items())
 
+    objects = ProjectContractQuerySet.as_manager()
+
     class Meta:
         ordering = ('-end_date',)
         verbose_name = 'contract'
@@ -65,18 +113,18 @@ class ProjectContract(models.Model):
         """
         Given a set of entries, exclude those included in any contract affiliated
         with any project associated with this contract.
+
+        The exclusion is a subquery, so the entries are still fetched with a
+        single query.
         """
-        contracts = []
-        for project in self.projects.all():
-            contracts.extend(project.contracts.all())
-
-        for contract in contracts:
-            entries.exclude(
-                project__in=contract.projects.all(),
-                start_time__gte=contract.start_date,
-                end_time__lt=contract.end_date + relativedelta(days=1)
-                )
-        return entries
+        contracts = ProjectContract.objects.filter(projects__in=self.projects.all())
+        included = Entry.no_join.filter(
+            project__contracts__in=contracts,
+            start_time__gte=F('project__contracts__start_date'),
+            end_time__lt=ExpressionWrapper(
+                F('project__contracts__end_date') + datetime.timedelta(days=1),
+                output_field=models.DateTimeField()))
+        return entries.exclude(pk__in=included.values('pk'))
 
     @property
     def pre_launch_entries(self):
@@ -117,6 +165,8 @@ class ProjectContract(models.Model):
             `approved_only` parameter.
         :rtype: Decimal
         """
+        if approved_only and hasattr(self, '_contracted'):
+            return self._contracted or 0
 
         qset = self.contract_hours
         if approved_only:
@@ -126,6 +176,8 @@ class ProjectContract(models.Model):
 
     def pending_hours(self):
         """Compute the contract hours still in pending status"""
+        if hasattr(self, '_pending'):
+            return self._pending or 0
         qset = self.contract_hours.filter(status=ContractHour.PENDING_STATUS)
         result = qset.aggregate(sum=Sum('hours'))['sum']
         return result or 0
@@ -368,46 +420,40 @@ class ContractAssignment(models.Model):
 
 class HourGroupManager(models.Manager):
 
-    def summaries(self, entries):
-        # Get the list of bundle names and hour sums
-        bundled_entries = entries.values('activity__activity_bundle',
-                                         'activity__activity_bundle__name')
-        bundled_entries = bundled_entries.annotate(hours__sum=Sum(
-            Func(F('hours'), Value(2), function='ROUND'))
-        )
-        bundled_entries = bundled_entries.order_by(
-            'activity__activity_bundle__order', 'activity__activity_bundle__name')
-        bundled_totals = list(bundled_entries.values_list(
-            'activity__activity_bundle__name',
-            'activity__activity_bundle',
-            'hours__sum',
-        ))
-        # Get the list of activity names and hour sums
-        activity_entries = entries.values('activity', 'activity__name',
-                                          'activity__activity_bundle')
-        activity_entries = activity_entries.annotate(hours__sum=Sum(
+    def summary_rows(self, entries):
+        """
+        Rounded hours of the entries per activity and activity bundle, in
+        a single grouped query. Each row carries the activity's billable
+        flag, so the rows of all entries can be split for ``summaries``.
+        """
+        rows = entries.values('activity', 'activity__name', 'activity__billable',
+                              'activity__activity_bundle__name')
+        rows = rows.annotate(hours__sum=Sum(
             Func(F('hours'), Value(2), function='ROUND'))
         )
-        activity_entries = activity_entries.order_by('activity')
-        activity_totals = list(activity_entries.values_list(
-            'activity__name',
-            'activity__activity_bundle',
-            'hours__sum',
-        ))
-        totals = {}
-        other_values = ()
-        for bundle in bundled_totals:
-            bundle_key, bundle_value = bundle[0], bundle[2]
-            act_values = [(act[0], act[2]) for act in activity_totals
-                          if act[1] == bundle[1]]
-            if bundle_key is not None:
-                totals[bundle_key] = (bundle_value, act_values)
-            else:
-                other_values = (bundle_value, act_values)
-        totals = sorted(totals.items())
-        if other_values:
-            totals.append(('Other', other_values))
-        all_totals = sum([bt[2] for bt in bundled_totals])
+        return list(rows.order_by('activity'))
+
+    def summaries(self, entries=None, rows=None):
+        """
+        Hours per activity bundle, and per activity within each bundle,
+        sorted by bundle name. Activities without a bundle are totalled
+        under 'Other', followed by the 'Total' of every bundle.
+
+        Either the entries or rows from ``summary_rows`` may be given.
+        """
+        if rows is None:
+            rows = self.summary_rows(entries)
+        bundles = {}
+        all_totals = 0
+        for row in rows:
+            bundle = bundles.setdefault(row['activity__activity_bundle__name'], [0, []])
+            bundle[0] += row['hours__sum']
+            bundle[1].append((row['activity__name'], row['hours__sum']))
+            all_totals += row['hours__sum']
+        other = bundles.pop(None, None)
+        totals = sorted((name, tuple(bundle)) for name, bundle in bundles.items())
+        if other:
+            totals.append(('Other', tuple(other)))
         totals.append(('Total', (all_totals, [])))
         return totals
 
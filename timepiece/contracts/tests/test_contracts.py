@@ -1,12 +1,15 @@
 import datetime
 import mock
+import random
 
 from dateutil.relativedelta import relativedelta
 
 from django.contrib.auth.models import Permission
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from timepiece.contracts.models import ProjectContract, ContractHour
@@ -72,6 +75,19 @@ class ContractListTestCase(ViewTestMixin, TestCase):
         for i in range(3):
             self.assertTrue(correct_contracts[i] in contracts)
 
+    def test_query_count(self):
+        """The number of queries does not grow with the number of contracts."""
+        factories.ProjectContract(
+            projects=self.projects, status=ProjectContract.STATUS_CURRENT)
+        with CaptureQueriesContext(connection) as one:
+            self._get()
+        for status in (ProjectContract.STATUS_CURRENT, ProjectContract.STATUS_UPCOMING,
+                       ProjectContract.STATUS_COMPLETE):
+            factories.ProjectContract(projects=self.projects, status=status)
+        with CaptureQueriesContext(connection) as many:
+            self._get()
+        self.assertEqual(len(many), len(one))
+
     def test_non_current_contracts(self):
         """List should return all current contracts."""
         factories.ProjectContract(
@@ -334,12 +350,14 @@ class ProjectContractEntryTestCase(TestCase):
         self.assertEqual(self.contract1.hours_worked, 10.0)
 
     def testContract1PostValues(self):
-        self.assertEqual(self.contract1.post_launch_entries.count(), 24)
-        self.assertEqual(self.contract1.post_launch_hours_worked, 24.0)
+        # Entries on Project B during Contract 2 are not post-launch.
+        self.assertEqual(self.contract1.post_launch_entries.count(), 19)
+        self.assertEqual(self.contract1.post_launch_hours_worked, 19.0)
 
     def testContract2PreValues(self):
-        self.assertEqual(self.contract2.pre_launch_entries.count(), 11)
-        self.assertEqual(self.contract2.pre_launch_hours_worked, 11.0)
+        # Entries on Project B during Contract 1 are not pre-launch.
+        self.assertEqual(self.contract2.pre_launch_entries.count(), 6)
+        self.assertEqual(self.contract2.pre_launch_hours_worked, 6.0)
 
     def testContract2Values(self):
         self.assertEqual(self.contract2.entries.count(), 5)
@@ -348,3 +366,94 @@ class ProjectContractEntryTestCase(TestCase):
     def testContract2PostValues(self):
         self.assertEqual(self.contract2.post_launch_entries.count(), 4)
         self.assertEqual(self.contract2.post_launch_hours_worked, 4.0)
+
+    def testWithHours(self):
+        """Annotated hours match the hours computed for a single contract."""
+        factories.ContractHour(
+            contract=self.contract2, hours=7, status=ContractHour.PENDING_STATUS)
+        factories.ContractAssignment(contract=self.contract2, num_hours=3)
+        start = timezone.now() - relativedelta(days=6)
+        factories.Entry(
+            user=self.user_b, project=self.project_b, activity__billable=False,
+            start_time=start, end_time=start + relativedelta(hours=2))
+        contracts = ProjectContract.objects.with_hours()
+        with self.assertNumQueries(1):
+            contracts = list(contracts.order_by('pk'))
+        self.assertEqual(len(contracts), 2)
+        with self.assertNumQueries(0):
+            hours = [(c.contracted_hours(), c.pending_hours(), c.hours_assigned,
+                      c.hours_worked, c.nonbillable_hours_worked)
+                     for c in contracts]
+        expected = []
+        for contract in ProjectContract.objects.order_by('pk'):
+            expected.append((
+                contract.contracted_hours(), contract.pending_hours(),
+                contract.hours_assigned, contract.hours_worked,
+                contract.nonbillable_hours_worked))
+        self.assertEqual(hours, expected)
+        self.assertEqual(hours[1][1:], (7, 3, 5, 2))
+
+
+class NoncontractEntriesTestCase(TestCase):
+    """Compares pre- and post-launch entries to a brute force reference."""
+
+    def setUp(self):
+        super(NoncontractEntriesTestCase, self).setUp()
+        rand = random.Random(1234)
+        self.today = datetime.date(2015, 6, 1)
+        self.projects = [factories.Project() for i in range(4)]
+        self.contracts = []
+        for i in range(5):
+            start_date = self.today + relativedelta(days=rand.randint(-40, 40))
+            end_date = start_date + relativedelta(days=rand.randint(0, 20))
+            projects = rand.sample(self.projects, rand.randint(1, 2))
+            self.contracts.append(factories.ProjectContract(
+                projects=projects, start_date=start_date, end_date=end_date))
+        user = factories.User()
+        activity = factories.Activity()
+        for i in range(80):
+            start_time = datetime.datetime.combine(
+                self.today, datetime.time()) + relativedelta(
+                    days=rand.randint(-60, 60), hours=rand.randint(0, 23))
+            factories.Entry(
+                user=user, project=rand.choice(self.projects), activity=activity,
+                start_time=start_time,
+                end_time=start_time + relativedelta(hours=rand.randint(1, 3)))
+
+    def is_included(self, entry, contract):
+        """Whether the entry falls in the contract."""
+        start = datetime.datetime.combine(contract.start_date, datetime.time())
+        end = datetime.datetime.combine(
+            contract.end_date + relativedelta(days=1), datetime.time())
+        return (entry.project in contract.projects.all() and
+                entry.start_time >= start and entry.end_time < end)
+
+    def get_noncontract_entries(self, contract, entries):
+        projects = set(contract.projects.all())
+        related = [c for c in ProjectContract.objects.all()
+                   if projects & set(c.projects.all())]
+        return [entry for entry in entries
+                if not any(self.is_included(entry, c) for c in related)]
+
+    def test_brute_force(self):
+        entries = list(Entry.objects.all())
+        for contract in ProjectContract.objects.all():
+            projects = set(contract.projects.all())
+            start = datetime.datetime.combine(contract.start_date, datetime.time())
+            end = datetime.datetime.combine(
+                contract.end_date + relativedelta(days=1), datetime.time())
+            pre_launch = self.get_noncontract_entries(contract, [
+                e for e in entries if e.project in projects and e.start_time < start])
+            post_launch = self.get_noncontract_entries(contract, [
+                e for e in entries if e.project in projects and e.start_time > end])
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    sorted(e.pk for e in contract.pre_launch_entries),
+                    sorted(e.pk for e in pre_launch))
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    sorted(e.pk for e in contract.post_launch_entries),
+                    sorted(e.pk for e in post_launch))
+            self.assertEqual(
+                contract.pre_launch_hours_worked + contract.post_launch_hours_worked,
+                sum(e.hours for e in pre_launch + post_launch))
@@ -1,6 +1,7 @@
 import datetime
 from dateutil.relativedelta import relativedelta
 import random
+import unittest
 
 from six.moves.urllib.parse import urlencode
 
@@ -12,6 +13,7 @@ from timepiece import utils
 from timepiece.forms import DATE_FORM_FORMAT
 from timepiece.tests import factories
 from timepiece.tests.base import ViewTestMixin, LogTimeMixin
+from timepiece.utils.export import pyarrow
 
 from timepiece.contracts.models import EntryGroup, HourGroup
 from timepiece.crm.models import Attribute
@@ -223,7 +225,7 @@ class InvoiceViewPreviousTestCase(ViewTestMixin, LogTimeMixin, TestCase):
         self.assertEqual(data['Content-Type'], 'text/csv')
         disposition = data['Content-Disposition']
         self.assertTrue(disposition.startswith('attachment; filename=Invoice'))
-        contents = response.content.decode('utf-8').splitlines()
+        contents = b''.join(response.streaming_content).decode('utf-8').splitlines()
         # TODO: Possibly find a meaningful way to test contents
         # Pull off header line and totals line
         contents.pop(0)  # header
@@ -231,6 +233,29 @@ class InvoiceViewPreviousTestCase(ViewTestMixin, LogTimeMixin, TestCase):
         num_entries = invoice.entries.all().count()
         self.assertEqual(num_entries, len(contents))
 
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_invoice_arrow(self):
+        """The locations and the totals row do not break the typed columns."""
+        invoice = self.get_invoice()
+        url = reverse('view_invoice_csv', args=[invoice.id])
+        response = self.client.get(url, {'format': 'arrow'})
+        self.assertEqual(response.status_code, 200)
+        table = pyarrow.ipc.open_stream(b''.join(response.streaming_content))
+        table = table.read_all()
+        self.assertEqual(str(table.schema.field('Breaks').type), 'double')
+        self.assertEqual(str(table.schema.field('Hours').type), 'double')
+        rows = table.to_pydict()
+        self.assertEqual(rows['Breaks'][-1], None)
+        self.assertEqual(
+            sorted(rows['Location'][:-1]),
+            sorted(str(entry.location) for entry in invoice.entries.all()))
+        self.assertEqual(len(rows['Date']), invoice.entries.count() + 1)
+        # The CSV totals row is unchanged.
+        response = self.client.get(url)
+        lines = b''.join(response.streaming_content).splitlines()
+        total = '{0:.2f}'.format(rows['Hours'][-1]).encode('utf-8')
+        self.assertEqual(lines[-1], b',,,,,,Total:,' + total)
+
     def test_invoice_csv_bad_id(self):
         url = reverse('view_invoice_csv', args=[9999999999])
         response = self.client.get(url)
@@ -735,3 +760,50 @@ class ListOutstandingInvoicesViewTestCase(ViewTestMixin, TestCase):
         # Verify that the date on the mark as invoiced links will be correct
         self.assertEquals(response.context['to_date'], self.to_date.date())
         self.assertEquals(response.context['from_date'], from_date.date())
+
+
+class HourGroupSummariesTestCase(TestCase):
+
+    def setUp(self):
+        super(HourGroupSummariesTestCase, self).setUp()
+        self.start = datetime.datetime(2011, 1, 1, 8)
+        self.design = factories.Activity(name='Design', billable=True)
+        self.code = factories.Activity(name='Code', billable=True)
+        self.meeting = factories.Activity(name='Meeting', billable=False)
+        self.support = factories.Activity(name='Support', billable=True)
+        web = HourGroup.objects.create(name='Web')
+        web.activities.add(self.design, self.code)
+        all_hours = HourGroup.objects.create(name='All')
+        all_hours.activities.add(self.design, self.meeting)
+        for activity, hours in ((self.design, 1), (self.code, 2), (self.code, 3),
+                                (self.meeting, 4), (self.support, 5)):
+            factories.Entry(
+                activity=activity, start_time=self.start,
+                end_time=self.start + relativedelta(hours=hours))
+
+    def test_summaries(self):
+        """Hours are totalled per bundle, then per activity within it."""
+        self.assertEqual(HourGroup.objects.summaries(Entry.objects.all()), [
+            ('All', (5, [('Design', 1), ('Meeting', 4)])),
+            ('Web', (6, [('Code', 5), ('Design', 1)])),
+            ('Other', (5, [('Support', 5)])),
+            ('Total', (16, [])),
+        ])
+
+    def test_no_entries(self):
+        summaries = HourGroup.objects.summaries(Entry.objects.none())
+        self.assertEqual(summaries, [('Total', (0, []))])
+
+    def test_rows(self):
+        """Billable and non-billable summaries can share one query."""
+        with self.assertNumQueries(1):
+            rows = HourGroup.objects.summary_rows(Entry.objects.all())
+            billable = HourGroup.objects.summaries(
+                rows=[row for row in rows if row['activity__billable']])
+            nonbillable = HourGroup.objects.summaries(
+                rows=[row for row in rows if not row['activity__billable']])
+        entries = Entry.objects.all()
+        self.assertEqual(billable, HourGroup.objects.summaries(
+            entries.filter(activity__billable=True)))
+        self.assertEqual(nonbillable, HourGroup.objects.summaries(
+            entries.filter(activity__billable=False)))
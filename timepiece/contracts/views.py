@@ -13,7 +13,7 @@ from django.views.generic import ListView, DetailView
 
 from timepiece import utils
 from timepiece.templatetags.timepiece_tags import seconds_to_hours
-from timepiece.utils.csv import CSVViewMixin
+from timepiece.utils.export import ExportViewMixin, round_hours
 from timepiece.utils.search import SearchListView
 from timepiece.utils.views import cbv_decorator
 
@@ -43,21 +43,22 @@ class ContractList(ListView):
     model = ProjectContract
     context_object_name = 'contracts'
     queryset = ProjectContract.objects.filter(
-        status=ProjectContract.STATUS_CURRENT).order_by('name')
+        status=ProjectContract.STATUS_CURRENT).with_hours().order_by('name')
 
     def get_context_data(self, *args, **kwargs):
         if 'today' not in kwargs:
             kwargs['today'] = datetime.date.today()
         if 'warning_date' not in kwargs:
             kwargs['warning_date'] = datetime.date.today() + relativedelta(weeks=2)
+        # The object list is evaluated once here and reused by the template.
         kwargs['max_work_fraction'] = max(
-            [0.0] + [c.fraction_hours for c in self.queryset.all()])
+            [0.0] + [c.fraction_hours for c in self.object_list])
         kwargs['max_schedule_fraction'] = max(
-            [0.0] + [c.fraction_schedule for c in self.queryset.all()])
+            [0.0] + [c.fraction_schedule for c in self.object_list])
         kwargs['projects_pending'] = ProjectContract.objects.filter(
-            status=ProjectContract.STATUS_UPCOMING).order_by('name')
+            status=ProjectContract.STATUS_UPCOMING).with_hours().order_by('name')
         kwargs['projects_complete'] = ProjectContract.objects.filter(
-            status=ProjectContract.STATUS_COMPLETE).order_by('name')
+            status=ProjectContract.STATUS_COMPLETE).with_hours().order_by('name')
         return super(ContractList, self).get_context_data(*args, **kwargs)
 
 
@@ -133,13 +134,16 @@ def create_invoice(request):
         .select_related()
     nonbillable_entries = entries.filter(activity__billable=False) \
         .select_related()
+    rows = HourGroup.objects.summary_rows(entries)
     return render(request, 'timepiece/invoice/create.html', {
         'invoice_form': invoice_form,
         'billable_entries': billable_entries,
         'nonbillable_entries': nonbillable_entries,
         'project': project,
-        'billable_totals': HourGroup.objects.summaries(billable_entries),
-        'nonbillable_totals': HourGroup.objects.summaries(nonbillable_entries),
+        'billable_totals': HourGroup.objects.summaries(
+            rows=[row for row in rows if row['activity__billable']]),
+        'nonbillable_totals': HourGroup.objects.summaries(
+            rows=[row for row in rows if not row['activity__billable']]),
         'from_date': from_date,
         'to_date': to_date,
     })
@@ -214,14 +218,15 @@ class InvoiceDetail(DetailView):
         nonbillable_entries = invoice.entries.filter(activity__billable=False)\
                                              .order_by('start_time')\
                                              .select_related()
+        rows = HourGroup.objects.summary_rows(invoice.entries.all())
         return {
             'invoice': invoice,
             'billable_entries': billable_entries,
-            'billable_totals': HourGroup.objects
-                                        .summaries(billable_entries),
+            'billable_totals': HourGroup.objects.summaries(
+                rows=[row for row in rows if row['activity__billable']]),
             'nonbillable_entries': nonbillable_entries,
-            'nonbillable_totals': HourGroup.objects
-                                           .summaries(nonbillable_entries),
+            'nonbillable_totals': HourGroup.objects.summaries(
+                rows=[row for row in rows if not row['activity__billable']]),
             'from_date': invoice.start,
             'to_date': invoice.end,
             'project': invoice.project,
@@ -246,7 +251,7 @@ class InvoiceEntriesDetail(InvoiceDetail):
         return context
 
 
-class InvoiceDetailCSV(CSVViewMixin, InvoiceDetail):
+class InvoiceDetailCSV(ExportViewMixin, InvoiceDetail):
 
     def get_filename(self, context):
         invoice = context['invoice']
@@ -255,8 +260,7 @@ class InvoiceDetailCSV(CSVViewMixin, InvoiceDetail):
         return 'Invoice-{0}-{1}'.format(project, end_day)
 
     def convert_context_to_csv(self, context):
-        rows = []
-        rows.append([
+        yield [
             'Date',
             'Weekday',
             'Name',
@@ -265,9 +269,9 @@ class InvoiceDetailCSV(CSVViewMixin, InvoiceDetail):
             'Time Out',
             'Breaks',
             'Hours',
-        ])
-        for entry in context['billable_entries']:
-            data = [
+        ]
+        for entry in context['billable_entries'].iterator():
+            yield [
                 entry.start_time.strftime('%x'),
                 entry.start_time.strftime('%A'),
                 entry.user.get_name_or_username(),
@@ -275,14 +279,12 @@ class InvoiceDetailCSV(CSVViewMixin, InvoiceDetail):
                 entry.start_time.strftime('%X'),
                 entry.end_time.strftime('%X'),
                 seconds_to_hours(entry.seconds_paused),
-                "{0:.2f}".format(entry.hours),
+                round_hours(entry.hours),
             ]
-            rows.append(data)
         total = context['billable_entries'].aggregate(hours=Sum(
             Func(F('hours'), Value(2), function='ROUND'))
         )['hours']
-        rows.append(('', '', '', '', '', '', 'Total:', "{0:.2f}".format(total)))
-        return rows
+        yield ('', '', '', '', '', '', 'Total:', round_hours(total))
 
 
 class InvoiceEdit(InvoiceDetail):
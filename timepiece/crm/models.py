@@ -4,9 +4,13 @@ from django.apps import apps
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.encoding import python_2_unicode_compatible
 
 from timepiece.utils import get_active_entry
+from timepiece.utils.cache import (
+    ACTIVE_ENTRIES, DASHBOARD, QUICK_CLOCK_IN, bump_version, invalidate_user)
 
 
 # Add a utility method to the User class that will tell whether or not a
@@ -201,3 +205,27 @@ class ProjectRelationship(models.Model):
             project=self.project.name,
             user=self.user.get_name_or_username(),
         )
+
+
+@receiver([post_save, post_delete], sender=Attribute)
+@receiver([post_save, post_delete], sender=Project)
+def invalidate_project_caches(sender, instance, **kwargs):
+    """
+    Whether projects can be clocked in to may have changed for anyone, as
+    may the names shown on the dashboard and with the open entries.
+    """
+    bump_version(QUICK_CLOCK_IN)
+    bump_version(DASHBOARD)
+    bump_version(ACTIVE_ENTRIES)
+
+
+@receiver([post_save, post_delete], sender=ProjectRelationship)
+def invalidate_relationship_caches(sender, instance, **kwargs):
+    """The user's paid leave projects may have changed."""
+    invalidate_user(QUICK_CLOCK_IN, instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_caches(sender, instance, **kwargs):
+    """The user's hours per week are shown on their dashboard."""
+    invalidate_user(DASHBOARD, instance.user_id)
@@ -1,6 +1,7 @@
 import datetime
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
+import unittest
 
 from django.utils import timezone
 from django.test import TestCase
@@ -8,6 +9,7 @@ from django.test import TestCase
 from timepiece import utils
 from timepiece.tests import factories
 from timepiece.tests.base import ViewTestMixin, LogTimeMixin
+from timepiece.utils.export import pyarrow
 
 from ..models import Project
 
@@ -139,11 +141,34 @@ class TestProjectTimesheet(ViewTestMixin, LogTimeMixin, TestCase):
         self.assertEqual(data['Content-Type'], 'text/csv')
         disposition = data['Content-Disposition']
         self.assertTrue(disposition.startswith('attachment; filename='))
-        contents = response.content.decode('utf-8').splitlines()
+        contents = b''.join(response.streaming_content).decode('utf-8').splitlines()
         headers = contents[0].split(',')
         # Assure user's comments are not included.
         self.assertTrue('comments' not in headers)
 
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_project_arrow(self):
+        """The totals row does not break the typed columns."""
+        self.login_user(self.superuser)
+        self.make_entries()
+        response = self._get(
+            url_name='view_project_timesheet_csv', url_args=(self.p1.pk,),
+            get_kwargs={'format': 'arrow'})
+        self.assertEqual(response.status_code, 200)
+        table = pyarrow.ipc.open_stream(b''.join(response.streaming_content))
+        table = table.read_all()
+        self.assertEqual(str(table.schema.field('Breaks').type), 'double')
+        self.assertEqual(str(table.schema.field('Hours').type), 'double')
+        rows = table.to_pydict()
+        self.assertEqual(rows['Breaks'][-1], None)
+        response = self._get(
+            url_name='view_project_timesheet_csv', url_args=(self.p1.pk,))
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(rows['Date']), len(lines) - 1)
+        # The CSV totals row is unchanged.
+        total = '{0:.2f}'.format(rows['Hours'][-1]).encode('utf-8')
+        self.assertEqual(lines[-1], b',,,,,,Total:,' + total)
+
     def testRoundingConversions(self):
         """
         Verify that entries (which are in seconds) approximate a correct hourly value
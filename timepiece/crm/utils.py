@@ -3,6 +3,7 @@ from itertools import groupby
 from django.db.models import Sum
 
 from timepiece.utils import add_timezone, get_hours_summary, get_week_start
+from timepiece.utils.expressions import DateTrunc
 
 
 def daily_summary(day_entries):
@@ -20,14 +21,11 @@ def daily_summary(day_entries):
 
 
 def grouped_totals(entries):
-    select = {
-        "day": {"date": """DATE_TRUNC('day', end_time)"""},
-        "week": {"date": """DATE_TRUNC('week', end_time)"""},
-    }
-    weekly = entries.extra(select=select["week"]).values('date', 'billable')
+    weekly = entries.annotate(date=DateTrunc('week', 'end_time'))
+    weekly = weekly.values('date', 'billable')
     weekly = weekly.annotate(hours=Sum('hours')).order_by('date')
-    daily = entries.extra(select=select["day"]).values('date', 'project__name',
-                                                       'billable')
+    daily = entries.annotate(date=DateTrunc('day', 'end_time'))
+    daily = daily.values('date', 'project__name', 'billable')
     daily = daily.annotate(hours=Sum('hours')).order_by('date',
                                                         'project__name')
     weeks = {}
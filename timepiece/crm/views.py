@@ -18,7 +18,7 @@ from django.views.generic import (
 from timepiece import utils
 from timepiece.forms import YearMonthForm, UserYearMonthForm
 from timepiece.templatetags.timepiece_tags import seconds_to_hours
-from timepiece.utils.csv import CSVViewMixin
+from timepiece.utils.export import ExportViewMixin, round_hours
 from timepiece.utils.search import SearchListView
 from timepiece.utils.views import cbv_decorator, format_totals
 
@@ -276,12 +276,10 @@ class ProjectTimesheet(DetailView):
                         'activity__name', 'status')
 
         month_entries = entries_qs.date_trunc('month', extra_values).order_by('start_time')
-        if month_entries:
-            format_totals(month_entries, "hours")
 
         total = entries_qs.aggregate(hours=Sum('hours'))['hours']
         if total:
-            total = "{0:.2f}".format(total)
+            total = round_hours(total)
         user_entries = entries_qs.order_by().values('user__first_name', 'user__last_name')
         user_entries = user_entries.annotate(sum=Sum('hours')).order_by('-sum')
         if user_entries:
@@ -304,7 +302,7 @@ class ProjectTimesheet(DetailView):
         return context
 
 
-class ProjectTimesheetCSV(CSVViewMixin, ProjectTimesheet):
+class ProjectTimesheetCSV(ExportViewMixin, ProjectTimesheet):
 
     def get_filename(self, context):
         project = self.object.name
@@ -312,8 +310,7 @@ class ProjectTimesheetCSV(CSVViewMixin, ProjectTimesheet):
         return 'Project_timesheet {0} {1}'.format(project, to_date_str)
 
     def convert_context_to_csv(self, context):
-        rows = []
-        rows.append([
+        yield [
             'Date',
             'User',
             'Activity',
@@ -322,9 +319,9 @@ class ProjectTimesheetCSV(CSVViewMixin, ProjectTimesheet):
             'Time Out',
             'Breaks',
             'Hours',
-        ])
-        for entry in context['entries']:
-            data = [
+        ]
+        for entry in context['entries'].iterator():
+            yield [
                 entry['start_time'].strftime('%x'),
                 entry['user__first_name'] + ' ' + entry['user__last_name'],
                 entry['activity__name'],
@@ -332,12 +329,10 @@ class ProjectTimesheetCSV(CSVViewMixin, ProjectTimesheet):
                 entry['start_time'].strftime('%X'),
                 entry['end_time'].strftime('%X'),
                 seconds_to_hours(entry['seconds_paused']),
-                entry['hours'],
+                round_hours(entry['hours']),
             ]
-            rows.append(data)
         total = context['total']
-        rows.append(('', '', '', '', '', '', 'Total:', total))
-        return rows
+        yield ('', '', '', '', '', '', 'Total:', total)
 
 
 # Businesses
@@ -2,7 +2,9 @@ import datetime
 from dateutil.relativedelta import relativedelta
 
 from django import forms
+from django.conf import settings
 from django.db.models import Q
+from django.utils import timezone
 
 from selectable import forms as selectable
 
@@ -204,3 +206,52 @@ class ProjectHoursSearchForm(forms.Form):
     def clean_week_start(self):
         week_start = self.cleaned_data.get('week_start', None)
         return utils.get_week_start(week_start, False) if week_start else None
+
+
+class EntryPageForm(forms.Form):
+    """Limits the number of entries in a page of an export."""
+    DEFAULT_LIMIT = 1000
+    MAX_LIMIT = 10000
+
+    limit = forms.IntegerField(required=False, min_value=1, max_value=MAX_LIMIT)
+
+    def clean_limit(self):
+        return self.cleaned_data.get('limit') or self.DEFAULT_LIMIT
+
+
+class EntryExportForm(EntryPageForm):
+    """Filters and pages the entries export."""
+    after = forms.IntegerField(required=False, min_value=0)
+    updated_since = forms.DateTimeField(required=False, input_formats=(
+        '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S',
+        '%Y-%m-%d'))
+
+
+class EntryChangesForm(EntryPageForm):
+    """
+    Pages the entries change feed. The cursor is the UTC time the last change
+    seen was made, and the entry's id.
+    """
+    CURSOR_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+    cursor = forms.CharField(required=False)
+
+    @classmethod
+    def encode_cursor(cls, date_updated, pk):
+        if timezone.is_aware(date_updated):
+            date_updated = timezone.make_naive(date_updated, timezone.utc)
+        return '{0}_{1}'.format(date_updated.strftime(cls.CURSOR_FORMAT), pk)
+
+    def clean_cursor(self):
+        cursor = self.cleaned_data.get('cursor')
+        if not cursor:
+            return None
+        try:
+            date_updated, pk = cursor.rsplit('_', 1)
+            date_updated = datetime.datetime.strptime(date_updated, self.CURSOR_FORMAT)
+            pk = int(pk)
+        except ValueError:
+            raise forms.ValidationError('Enter a cursor returned by a previous page.')
+        if settings.USE_TZ:
+            date_updated = timezone.make_aware(date_updated, timezone.utc)
+        return date_updated, pk
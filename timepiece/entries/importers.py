@@ -0,0 +1,227 @@
+from __future__ import absolute_import
+
+import csv
+from decimal import Decimal
+from itertools import islice
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms.utils import from_current_timezone
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_text
+
+from timepiece.crm.models import Project
+from timepiece.entries.models import (
+    Activity, ActivityGroup, Entry, Location)
+from timepiece.utils.cache import DASHBOARD, QUICK_CLOCK_IN, invalidate_user
+
+
+def read_csv(lines):
+    """
+    Yields the line number and a dict of field values for each row of CSV
+    with a header.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(lines):
+    """
+    Yields the line number and object of each non-blank line of newline
+    delimited JSON, or None for lines which are not valid JSON.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+class EntryImporter(object):
+    """
+    Creates entries from numbered rows of field values, as read by
+    ``read_csv`` or ``read_ndjson``, a chunk at a time.
+
+    Rows have the ``user``, ``project``, ``activity`` and ``location`` ids,
+    ``start_time`` and ``end_time``, and optionally ``seconds_paused``,
+    ``status`` and ``comments``, as exported by ``export_entries``. Other
+    fields are ignored, so every row creates a new entry.
+
+    Each chunk is validated as ``Entry.clean`` would validate its entries,
+    but with a fixed number of queries, and its valid entries are created
+    with ``bulk_create``, which rebuilds their rollups. Invalid rows are
+    skipped; their numbers and messages are collected in ``errors``. Entries
+    are checked for overlaps against each other and the entries of earlier
+    chunks; of two overlapping rows, the first is kept, whatever the chunk
+    size.
+    """
+    LIMIT_SECONDS = 60 * 60 * 12
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.errors = []
+        self._users = set()
+
+    def run(self, rows):
+        """Imports the rows, returning the number of entries created."""
+        rows = iter(rows)
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self.import_chunk(chunk)
+        finally:
+            # Earlier chunks are committed even if a later one fails.
+            self.finish()
+        self.errors.sort(key=lambda error: error[0])
+        return self.created
+
+    @transaction.atomic
+    def import_chunk(self, rows):
+        entries = {}
+        for number, row in rows:
+            try:
+                entries[number] = self.build_entry(row)
+            except ValidationError as e:
+                self.errors.append((number, e.messages))
+        self.check_related(entries)
+        self.check_overlaps(entries)
+        Entry.no_join.bulk_create(entries.values())
+        self.created += len(entries)
+        self._users.update(entry.user_id for entry in entries.values())
+
+    def finish(self):
+        """Invalidates the caches which bulk creation bypasses."""
+        for user_id in self._users:
+            invalidate_user(QUICK_CLOCK_IN, user_id)
+            invalidate_user(DASHBOARD, user_id)
+        self._users = set()
+
+    def build_entry(self, row):
+        """
+        Returns an unsaved entry from the row's values, with its hours, or
+        raises a ValidationError if a value is missing or malformed.
+        """
+        if not isinstance(row, dict):
+            raise ValidationError('The row is not an object of entry fields.')
+        errors = []
+
+        def parse(name, parser, default=None):
+            value = row.get(name)
+            if value is None or value == '':
+                if default is None:
+                    errors.append('{0} is required.'.format(name))
+                return default
+            try:
+                return parser(value)
+            except (TypeError, ValueError, ValidationError):
+                errors.append('{0} is not valid: {1!r}.'.format(name, value))
+
+        entry = Entry(
+            user_id=parse('user', int),
+            project_id=parse('project', int),
+            activity_id=parse('activity', int),
+            location_id=parse('location', int),
+            start_time=parse('start_time', self.parse_time),
+            end_time=parse('end_time', self.parse_time),
+            seconds_paused=parse('seconds_paused', int, 0),
+            status=parse('status', force_text, Entry.UNVERIFIED),
+            comments=parse('comments', force_text, ''),
+        )
+        if entry.status not in Entry.STATUSES:
+            errors.append('{0} is not a status.'.format(entry.status))
+        if entry.seconds_paused is not None and entry.seconds_paused < 0:
+            errors.append('seconds_paused must not be negative.')
+        if errors:
+            raise ValidationError(errors)
+
+        if entry.end_time <= entry.start_time:
+            raise ValidationError('Ending time must exceed the starting time')
+        delta = entry.end_time - entry.start_time
+        seconds = delta.days * 86400 + delta.seconds
+        if seconds > self.LIMIT_SECONDS or entry.seconds_paused > self.LIMIT_SECONDS:
+            raise ValidationError(
+                'Ending time exceeds starting time by 12 hours or more')
+        # As Entry.save would, without working out whether it is paused.
+        hours = max(seconds - entry.seconds_paused, 0) / 3600.0
+        entry.hours = Decimal('%.5f' % round(hours, 5))
+        return entry
+
+    def parse_time(self, value):
+        value = parse_datetime(force_text(value).strip())
+        if value is None:
+            raise ValueError
+        if settings.USE_TZ and timezone.is_naive(value):
+            return from_current_timezone(value)
+        if not settings.USE_TZ and timezone.is_aware(value):
+            return timezone.make_naive(value, timezone.get_current_timezone())
+        return value
+
+    def check_related(self, entries):
+        """
+        Removes the entries whose related objects do not exist, or whose
+        activity is not allowed on their project, and sets the related
+        objects of the others.
+        """
+        related = {}
+        for name, queryset in (
+                ('user', User.objects.all()),
+                ('project', Project.objects.select_related('business')),
+                ('activity', Activity.objects.all()),
+                ('location', Location.objects.all())):
+            ids = set(getattr(e, name + '_id') for e in entries.values())
+            related[name] = queryset.in_bulk(ids)
+        groups = set(p.activity_group_id for p in related['project'].values())
+        allowed = ActivityGroup.activities.through.objects.filter(
+            activitygroup__in=groups - set([None]))
+        allowed = set(allowed.values_list('activitygroup', 'activity'))
+
+        for number, entry in list(entries.items()):
+            errors = []
+            for name, objects in related.items():
+                obj = objects.get(getattr(entry, name + '_id'))
+                if obj is None:
+                    errors.append('{0} {1} does not exist.'.format(
+                        name, getattr(entry, name + '_id')))
+                else:
+                    setattr(entry, name, obj)
+            if not errors:
+                group = entry.project.activity_group_id
+                if group is not None and (group, entry.activity_id) not in allowed:
+                    errors.append('{0} is not allowed for this project.'.format(
+                        entry.activity.name))
+            if errors:
+                self.errors.append((number, errors))
+                del entries[number]
+
+    def check_overlaps(self, entries):
+        """
+        Removes the entries which overlap a saved entry or an earlier row's
+        entry which is kept. The first of two overlapping rows is kept, as it
+        would be if the rows were in different chunks.
+        """
+        numbers = sorted(entries)
+        candidates = [entries[number] for number in numbers]
+        overlaps = Entry.no_join.find_overlaps(candidates)
+        indexes = dict((id(entry), index) for index, entry in enumerate(candidates))
+        rejected = set()
+        for index, number in enumerate(numbers):
+            for other in overlaps.get(index, []):
+                other_index = indexes.get(id(other))
+                if other_index is not None and (
+                        other_index > index or other_index in rejected):
+                    continue
+                error = candidates[index].get_overlap_error(other)
+                self.errors.append((number, error.messages))
+                rejected.add(index)
+                del entries[number]
+                break
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('crm', '0003_auto_20151119_0906'),
+        ('entries', '0003_auto_20151217_1350'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntryRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('status', models.CharField(max_length=24, choices=[('unverified', 'Unverified'), ('verified', 'Verified'), ('approved', 'Approved'), ('invoiced', 'Invoiced'), ('not-invoiced', 'Not Invoiced')])),
+                ('day', models.DateTimeField(db_index=True, help_text='The start of the day the entries ended on.')),
+                ('hours', models.DecimalField(default=0, max_digits=15, decimal_places=5)),
+                ('activity', models.ForeignKey(related_name='entry_rollups', to='entries.Activity')),
+                ('project', models.ForeignKey(related_name='entry_rollups', to='crm.Project')),
+                ('user', models.ForeignKey(related_name='timepiece_entry_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EntryRollupCoverage',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('start', models.DateTimeField(blank=True, null=True)),
+                ('end', models.DateTimeField(blank=True, null=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='entryrollup',
+            unique_together=set([('user', 'project', 'activity', 'status', 'day')]),
+        ),
+    ]
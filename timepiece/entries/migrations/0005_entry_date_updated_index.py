@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0004_entryrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='entry',
+            name='date_updated',
+            field=models.DateTimeField(db_index=True, auto_now=True),
+        ),
+    ]
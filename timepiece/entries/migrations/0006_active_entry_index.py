@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Only PostgreSQL and SQLite support partial indexes. Elsewhere, active entries
+# are found with the end_time index.
+PARTIAL_INDEX_VENDORS = ('postgresql', 'sqlite')
+
+
+def create_active_entry_index(apps, schema_editor):
+    if schema_editor.connection.vendor in PARTIAL_INDEX_VENDORS:
+        schema_editor.execute(
+            'CREATE INDEX timepiece_entry_active_user_id '
+            'ON timepiece_entry (user_id) WHERE end_time IS NULL')
+
+
+def drop_active_entry_index(apps, schema_editor):
+    if schema_editor.connection.vendor in PARTIAL_INDEX_VENDORS:
+        schema_editor.execute('DROP INDEX timepiece_entry_active_user_id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0005_entry_date_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_active_entry_index, drop_active_entry_index),
+    ]
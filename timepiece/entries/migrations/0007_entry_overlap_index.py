@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0006_active_entry_index'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='entry',
+            index_together=set([('user', 'start_time', 'end_time')]),
+        ),
+    ]
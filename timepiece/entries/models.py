@@ -1,18 +1,32 @@
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 from decimal import Decimal
+from functools import reduce
+import operator
 
 from dateutil.relativedelta import relativedelta
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core import validators
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import F, Q, Sum, Max, Min
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Sum, When
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save)
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 
 from timepiece import utils
 from timepiece.crm.models import Project
+from timepiece.utils.cache import (
+    ACTIVE_ENTRIES, DASHBOARD, QUICK_CLOCK_IN, bump_version, get_value,
+    invalidate_user)
+from timepiece.utils.expressions import DateTrunc
+
+
+# The fields of an entry which its daily rollups are summed by.
+ROLLUP_FIELDS = ('user', 'project', 'activity', 'status', 'end_time', 'hours')
 
 
 @python_2_unicode_compatible
@@ -67,17 +81,11 @@ class EntryQuerySet(models.query.QuerySet):
     """QuerySet extension to provide filtering by billable status"""
 
     def date_trunc(self, key='month', extra_values=None):
-        select = {
-            "day": {"date": """DATE_TRUNC('day', end_time)"""},
-            "week": {"date": """DATE_TRUNC('week', end_time)"""},
-            "month": {"date": """DATE_TRUNC('month', end_time)"""},
-            "year": {"date": """DATE_TRUNC('year', end_time)"""},
-        }
         basic_values = (
             'user', 'date', 'user__first_name', 'user__last_name', 'billable',
         )
         extra_values = extra_values or ()
-        qs = self.extra(select=select[key])
+        qs = self.annotate(date=DateTrunc(key, 'end_time'))
         qs = qs.values(*basic_values + extra_values)
         qs = qs.annotate(hours=Sum('hours')).order_by(
             'user__last_name',
@@ -107,41 +115,139 @@ class EntryQuerySet(models.query.QuerySet):
         datesQ |= Q(end_time__isnull=True) if current else Q()
         return self.filter(datesQ)
 
+    def update(self, **kwargs):
+        """
+        Bulk updates bypass ``auto_now`` and the signals which keep the daily
+        rollups up to date. ``date_updated`` is set here, to keep changed
+        entries visible to ``changed_since``, and the rollups of the days the
+        entries were on before and after the update are rebuilt.
+        """
+        kwargs.setdefault('date_updated', timezone.now())
+        names = set(name[:-3] if name.endswith('_id') else name for name in kwargs)
+        if names.isdisjoint(ROLLUP_FIELDS):
+            return super(EntryQuerySet, self).update(**kwargs)
+        with transaction.atomic(using=self.db):
+            keys = EntryRollup.objects.get_keys(self, kwargs)
+            count = super(EntryQuerySet, self).update(**kwargs)
+            if keys is None:
+                EntryRollup.objects.rebuild()
+            else:
+                EntryRollup.objects.rebuild_keys(keys)
+        return count
+
+    def bulk_create(self, objs, batch_size=None):
+        """
+        Creates the entries, and rebuilds the rollups of the days they are
+        on, which bulk creation would otherwise bypass.
+        """
+        with transaction.atomic(using=self.db):
+            objs = super(EntryQuerySet, self).bulk_create(objs, batch_size)
+            EntryRollup.objects.rebuild_keys(
+                (entry.user_id, entry.project_id, _get_day_start(entry.end_time))
+                for entry in objs if entry.end_time is not None)
+        return objs
+
+    def changed_since(self, cursor=None, until=None):
+        """
+        Entries changed after ``cursor``, and not after ``until``, oldest
+        change first.
+
+        The cursor is the ``(date_updated, id)`` of the last change already
+        seen. Changes at the same time are ordered by id, so paging through
+        them neither skips nor repeats an entry.
+
+        ``date_updated`` is the time an entry was saved, not the time its
+        transaction committed, so a change may become visible after later
+        changes have been read. Limiting the changes to those made before
+        ``until`` keeps the cursor behind transactions which may still be
+        open.
+        """
+        entries = self.order_by('date_updated', 'id')
+        if until is not None:
+            entries = entries.filter(date_updated__lte=until)
+        if cursor is not None:
+            date_updated, pk = cursor
+            entries = entries.filter(
+                Q(date_updated__gt=date_updated) |
+                Q(date_updated=date_updated, id__gt=pk))
+        return entries
+
+    def overlapping(self, start, end):
+        """
+        Closed entries which overlap the time from start to end, inclusive.
+        This is a single range condition, which the index on user, start
+        and end time can answer when the entries are filtered by user.
+        """
+        return self.filter(start_time__lte=end, end_time__gte=start)
+
+    def find_overlaps(self, entries):
+        """
+        Checks candidate entries against each other and against these
+        entries, with a single query. Returns a dict from the index of each
+        candidate which overlaps other entries to a list of those entries,
+        in order of start time.
+
+        As in ``Entry.clean``, open candidates take up their first second
+        and open saved entries are ignored. Saved candidates (which are being
+        edited) are checked as they are, not as they were saved.
+        """
+        spans = defaultdict(list)
+        for index, entry in enumerate(entries):
+            if entry.user_id and entry.start_time:
+                start, end = entry.get_span()
+                spans[entry.user_id].append((start, end, index, entry))
+        if not spans:
+            return {}
+
+        # Fetch each user's closed entries between their first candidate's
+        # start and their last candidate's end.
+        windows = Q()
+        for user_id, user_spans in spans.items():
+            windows |= Q(user_id=user_id) & Q(
+                start_time__lte=max(span[1] for span in user_spans),
+                end_time__gte=min(span[0] for span in user_spans))
+        saved = self.filter(windows).order_by()
+        saved = saved.exclude(pk__in=[e.pk for e in entries if e.pk])
+        for entry in saved.select_related('project__business', 'activity'):
+            spans[entry.user_id].append(
+                (entry.start_time, entry.end_time, None, entry))
+
+        # Sweep through each user's entries by start time, keeping those
+        # which have not yet ended. Without overlaps there is at most one.
+        overlaps = defaultdict(list)
+        for user_spans in spans.values():
+            user_spans.sort(key=lambda span: span[0])
+            ongoing = []
+            for start, end, index, entry in user_spans:
+                ongoing = [span for span in ongoing if span[1] >= start]
+                for other_start, other_end, other_index, other in ongoing:
+                    if index is not None:
+                        overlaps[index].append(other)
+                    if other_index is not None:
+                        overlaps[other_index].append(entry)
+                ongoing.append((start, end, index, entry))
+        return dict(overlaps)
+
 
 class EntryManager(models.Manager):
 
     def get_queryset(self):
-        qs = EntryQuerySet(self.model)
+        qs = EntryQuerySet(self.model, using=self._db, hints=self._hints)
         qs = qs.select_related('activity', 'project__type')
-
-        # ensure our select_related are added.  Without this line later calls
-        # to select_related will void ours (not sure why - probably a bug
-        # in Django)
-        # in other words: do not remove!
-        str(qs.query)
-
-        import django
-        if django.VERSION >= (1, 8):
-            # extra() is slowly but surely being deprecated.
-            # Newer Django versions have powerful F expressions to replace it.
-            # An entry is billable if both its project and activity are billable.
-            # We make use of a Django internal function to force the
-            # query to use the logical rather than bitwise conjunction operator.
-            project_billable = F('project__type__billable')
-            activity_billable = F('activity__billable')
-            logical_and = 'AND'  # bitwise would be '&'
-            billable = project_billable._combine(activity_billable, logical_and, False)
-            qs = qs.annotate(billable=billable)
-        else:
-            qs = qs.extra({
-                'billable': 'timepiece_activity.billable AND '
-                            'timepiece_attribute.billable',
-            })
-        return qs
+        return qs.annotate(billable=_get_billable())
 
     def date_trunc(self, key='month', extra_values=()):
         return self.get_queryset().date_trunc(key, extra_values)
 
+    def get_active_entries(self):
+        """
+        Returns everyone's open entries. They are cached for all users until
+        an entry is saved or deleted.
+        """
+        entries = self.filter(end_time__isnull=True)
+        entries = entries.select_related('user', 'project__business', 'activity')
+        return get_value(ACTIVE_ENTRIES, lambda: list(entries))
+
     def timespan(self, from_date, to_date=None, span='month'):
         return self.get_queryset().timespan(from_date, to_date, span)
 
@@ -187,17 +293,18 @@ class Entry(models.Model):
     seconds_paused = models.PositiveIntegerField(default=0)
     pause_time = models.DateTimeField(blank=True, null=True)
     comments = models.TextField(blank=True)
-    date_updated = models.DateTimeField(auto_now=True)
+    date_updated = models.DateTimeField(auto_now=True, db_index=True)
 
     hours = models.DecimalField(max_digits=11, decimal_places=5, default=0)
 
     objects = EntryManager()
     worked = EntryWorkedManager()
-    no_join = models.Manager()
+    no_join = EntryQuerySet.as_manager()
 
     class Meta:
         db_table = 'timepiece_entry'  # Using legacy table name
         ordering = ('-start_time',)
+        index_together = (('user', 'start_time', 'end_time'),)
         verbose_name_plural = 'entries'
         permissions = (
             ('can_clock_in', 'Can use Pendulum to clock in'),
@@ -243,74 +350,58 @@ class Entry(models.Model):
 
     def is_overlapping(self):
         if self.start_time and self.end_time:
-            entries = self.user.timepiece_entries.filter(
-                Q(end_time__range=(self.start_time, self.end_time)) |
-                Q(start_time__range=(self.start_time, self.end_time)) |
-                Q(start_time__lte=self.start_time, end_time__gte=self.end_time)
-            )
-
-            totals = entries.aggregate(max=Max('end_time'), min=Min('start_time'))
+            entries = Entry.no_join.filter(user_id=self.user_id)
+            open_entries = entries.filter(
+                end_time__isnull=True,
+                start_time__range=(self.start_time, self.end_time))
+            entries = entries.overlapping(self.start_time, self.end_time)
+            entries = list(entries | open_entries)
+            if not entries:
+                return False
 
-            totals['total'] = 0
-            for entry in entries:
-                totals['total'] = totals['total'] + entry.get_total_seconds()
+            total = sum(entry.get_total_seconds() for entry in entries)
+            ends = [entry.end_time for entry in entries if entry.end_time]
+            diff = max(ends or [self.end_time]) - min(e.start_time for e in entries)
+            diff = diff.seconds + diff.days * 86400
+            return total > diff
+        else:
+            return None
 
-            totals['diff'] = totals['max'] - totals['min']
-            totals['diff'] = totals['diff'].seconds + \
-                totals['diff'].days * 86400
+    def get_span(self):
+        """
+        Returns the start and end of the time the entry takes up. Current
+        entries, which have no end time, take up their first second.
+        """
+        return self.start_time, self.end_time or self.start_time + relativedelta(seconds=1)
 
-            if totals['total'] > totals['diff']:
-                return True
-            else:
-                return False
+    def get_overlap_error(self, entry):
+        """Returns the validation error for overlapping the closed entry."""
+        start, end = self.get_span()
+        if entry.start_time.date() == start.date() and entry.end_time.date() == end.date():
+            time_format = '%H:%M:%S'
         else:
-            return None
+            time_format = '%H:%M:%S on %m\%d\%Y'
+        return ValidationError(
+            'Start time overlaps with {activity} on {project} from {start_time} to '
+            '{end_time}.'.format(
+                activity=entry.activity, project=entry.project,
+                start_time=entry.start_time.strftime(time_format),
+                end_time=entry.end_time.strftime(time_format)))
 
     def clean(self):
         if not self.user_id:
             raise ValidationError('An unexpected error has occured')
         if not self.start_time:
             raise ValidationError('Please enter a valid start time')
-        start = self.start_time
+        start, end = self.get_span()
 
-        if self.end_time:
-            end = self.end_time
-        # Current entries have no end_time
-        else:
-            end = start + relativedelta(seconds=1)
-
-        entries = self.user.timepiece_entries.filter(
-            Q(end_time__range=(start, end)) |
-            Q(start_time__range=(start, end)) |
-            Q(start_time__lte=start, end_time__gte=end))
+        entries = Entry.no_join.filter(user_id=self.user_id).overlapping(start, end)
         # An entry can not conflict with itself so remove it from the list
         if self.id:
             entries = entries.exclude(pk=self.id)
-        for entry in entries:
-            entry_data = {
-                'project': entry.project,
-                'activity': entry.activity,
-                'start_time': entry.start_time,
-                'end_time': entry.end_time
-            }
-            # Conflicting saved entries
-            if entry.end_time:
-                if entry.start_time.date() == start.date() and entry.end_time.date() == end.date():
-                    entry_data['start_time'] = entry.start_time.strftime(
-                        '%H:%M:%S')
-                    entry_data['end_time'] = entry.end_time.strftime(
-                        '%H:%M:%S')
-                    raise ValidationError('Start time overlaps with '
-                                          '{activity} on {project} from {start_time} to '
-                                          '{end_time}.'.format(**entry_data))
-                else:
-                    entry_data['start_time'] = entry.start_time.strftime(
-                        '%H:%M:%S on %m\%d\%Y')
-                    entry_data['end_time'] = entry.end_time.strftime(
-                        '%H:%M:%S on %m\%d\%Y')
-                    raise ValidationError(
-                        'Start time overlaps with {activity} on {project} '
-                        'from {start_time} to {end_time}.'.format(**entry_data))
+        entry = entries.select_related('project__business', 'activity').first()
+        if entry is not None:
+            raise self.get_overlap_error(entry)
         try:
             act_group = self.project.activity_group
             if act_group:
@@ -483,41 +574,316 @@ class Entry(models.Model):
         total worked (e.g., sick time, vacation time, etc.).  Those hours will
         be added to the summary separately using the dictionary key set in
         TIMEPIECE_PAID_LEAVE_PROJECTS.
+
+        All of the hours are summed in a single query.
         """
         projects = utils.get_setting('TIMEPIECE_PAID_LEAVE_PROJECTS')
-        entries = user.timepiece_entries.filter(
-            end_time__gt=date, end_time__lt=end_date)
-        data = {
-            'billable': Decimal('0'), 'non_billable': Decimal('0'),
-            'invoiced': Decimal('0'), 'uninvoiced': Decimal('0'),
-            'total': Decimal('0')
-            }
-        invoiced = entries.filter(
-            status=Entry.INVOICED).aggregate(i=Sum('hours'))['i']
-        uninvoiced = entries.exclude(
-            status=Entry.INVOICED).aggregate(uninv=Sum('hours'))['uninv']
-        total = entries.aggregate(s=Sum('hours'))['s']
-        if invoiced:
-            data['invoiced'] = invoiced
-        if uninvoiced:
-            data['uninvoiced'] = uninvoiced
-        if total:
-            data['total'] = total
-        billable = entries.exclude(project__in=projects.values())
-        billable = billable.values(
-            'billable',
-        ).annotate(s=Sum('hours'))
-        for row in billable:
-            if row['billable']:
-                data['billable'] += row['s']
-            else:
-                data['non_billable'] += row['s']
-        data['total_worked'] = data['billable'] + data['non_billable']
-        data['paid_leave'] = {}
-        for name, pk in projects.items():
-            qs = entries.filter(project=projects[name])
-            data['paid_leave'][name] = qs.aggregate(s=Sum('hours'))['s']
-        return data
+        entries = Entry.no_join.filter(
+            user=user, end_time__gt=date, end_time__lt=end_date)
+        totals = entries.aggregate(**_get_summary_aggregates(projects))
+        return _get_summary(totals, projects)
+
+
+def _get_summary_aggregates(projects):
+    """
+    Returns the conditional aggregates from which Entry.summary is built.
+
+    projects is the TIMEPIECE_PAID_LEAVE_PROJECTS setting.
+    """
+    def _sum_hours(*args, **kwargs):
+        when = When(Q(*args, **kwargs), then='hours')
+        return Sum(Case(when, output_field=models.DecimalField()))
+
+    workQ = ~Q(project__in=projects.values()) if projects else Q()
+    billableQ = Q(activity__billable=True, project__type__billable=True)
+    aggregates = {
+        'invoiced': _sum_hours(status=Entry.INVOICED),
+        'uninvoiced': _sum_hours(~Q(status=Entry.INVOICED)),
+        'total': Sum('hours'),
+        'billable': _sum_hours(workQ & billableQ),
+        'non_billable': _sum_hours(workQ & ~billableQ),
+    }
+    for index, pk in enumerate(projects.values()):
+        aggregates['paid_leave_%d' % index] = _sum_hours(project=pk)
+    return aggregates
+
+
+def _get_summary(totals, projects):
+    """Builds the Entry.summary dictionary from the aggregated totals."""
+    data = {}
+    for key in ('billable', 'non_billable', 'invoiced', 'uninvoiced', 'total'):
+        data[key] = totals.get(key) or Decimal('0')
+    data['total_worked'] = data['billable'] + data['non_billable']
+    data['paid_leave'] = {}
+    for index, name in enumerate(projects.keys()):
+        data['paid_leave'][name] = totals.get('paid_leave_%d' % index)
+    return data
+
+
+def _get_billable():
+    """
+    An entry is billable if both its project and activity are billable.
+
+    We make use of a Django internal function to force the query to use the
+    logical rather than bitwise conjunction operator.
+    """
+    project_billable = F('project__type__billable')
+    activity_billable = F('activity__billable')
+    return project_billable._combine(activity_billable, 'AND', False)
+
+
+def _get_day_start(value):
+    if settings.USE_TZ:
+        value = timezone.localtime(value)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _get_next_day_start(value):
+    # Midday of the next day is on that day whatever the change in offset.
+    return _get_day_start(_get_day_start(value) + relativedelta(days=1, hours=12))
+
+
+class EntryRollupQuerySet(models.query.QuerySet):
+
+    def date_trunc(self, key='month', extra_values=None):
+        """Rows shaped like those of EntryQuerySet.date_trunc."""
+        basic_values = (
+            'user', 'date', 'user__first_name', 'user__last_name', 'billable',
+        )
+        extra_values = extra_values or ()
+        qs = self.annotate(date=DateTrunc(key, 'day'))
+        qs = qs.values(*basic_values + extra_values)
+        qs = qs.annotate(hours=Sum('hours')).order_by(
+            'user__last_name',
+            'user__first_name',
+            'user__pk',
+            'date')
+        return qs
+
+
+class EntryRollupManager(models.Manager):
+    # SQLite limits the depth of a query's conditions.
+    RANGES_PER_QUERY = 100
+
+    def get_queryset(self):
+        # Billable is not stored so that changing whether an activity or
+        # project type is billable does not require a rebuild.
+        qs = EntryRollupQuerySet(self.model)
+        return qs.annotate(billable=_get_billable())
+
+    def date_trunc(self, key='month', extra_values=()):
+        return self.get_queryset().date_trunc(key, extra_values)
+
+    def covers(self, start, end):
+        """
+        Returns whether the rollups have been rebuilt for every day from
+        start up to, but not including, end.
+        """
+        startQ = Q(start__isnull=True) | Q(start__lte=start)
+        endQ = Q(end__isnull=True) | Q(end__gte=end)
+        return EntryRollupCoverage.objects.filter(startQ, endQ).exists()
+
+    def get_keys(self, entries, changes=None):
+        """
+        Returns the ``(user, project, day)`` keys of the rollups of the given
+        entries, both before and after they are updated with the ``changes``
+        field values, or None if the user, project or end time is changed to
+        an expression, as its values, and so the keys, are not known.
+        """
+        changed = {}
+        for name in ('user', 'project', 'end_time'):
+            for key in (name, name + '_id'):
+                if key in (changes or {}):
+                    changed[name] = getattr(changes[key], 'pk', changes[key])
+        if any(hasattr(value, 'resolve_expression') for value in changed.values()):
+            return None
+        entries = entries.order_by().annotate(day=DateTrunc('day', 'end_time'))
+        keys = set()
+        for user_id, project_id, day in entries.values_list(
+                'user', 'project', 'day').distinct():
+            keys.add((user_id, project_id, day))
+            if changed:
+                if 'end_time' in changed:
+                    end_time = changed['end_time']
+                    day = end_time and _get_day_start(end_time)
+                keys.add((changed.get('user', user_id),
+                          changed.get('project', project_id), day))
+        return set(key for key in keys if key[2] is not None)
+
+    @transaction.atomic
+    def rebuild(self, users=None, projects=None, start=None, end=None,
+                batch_size=1000):
+        """
+        Recomputes the rollups of the given users and projects for the days
+        from start up to, but not including, end. Omitted arguments do not
+        restrict the rebuild, but empty collections rebuild nothing.
+        """
+        if users is not None and not users or projects is not None and not projects:
+            return
+        if users is not None:
+            self._lock_users(users)
+        rollups = super(EntryRollupManager, self).get_queryset()
+        entries = Entry.no_join.filter(end_time__isnull=False)
+        if users is not None:
+            rollups = rollups.filter(user__in=users)
+            entries = entries.filter(user__in=users)
+        if projects is not None:
+            rollups = rollups.filter(project__in=projects)
+            entries = entries.filter(project__in=projects)
+        if start is not None:
+            rollups = rollups.filter(day__gte=start)
+            entries = entries.filter(end_time__gte=start)
+        if end is not None:
+            rollups = rollups.filter(day__lt=end)
+            entries = entries.filter(end_time__lt=end)
+        self._rebuild(rollups, entries, batch_size)
+
+    @transaction.atomic
+    def rebuild_keys(self, keys, batch_size=1000):
+        """
+        Recomputes the rollups of the given ``(user, project, day)`` keys and
+        no others, so that entries on scattered days do not rebuild the days
+        between them. Each user and project's consecutive days are rebuilt
+        as one range, a bounded number of ranges per query.
+        """
+        days = defaultdict(set)
+        for user_id, project_id, day in keys:
+            days[user_id, project_id].add(_get_day_start(day))
+        if not days:
+            return
+        self._lock_users(set(user_id for user_id, project_id in days))
+        ranges = []
+        for (user_id, project_id), starts in sorted(days.items()):
+            end = None
+            for day in sorted(starts):
+                if day != end:
+                    ranges.append([user_id, project_id, day, None])
+                end = ranges[-1][3] = _get_next_day_start(day)
+        rollups = super(EntryRollupManager, self).get_queryset()
+        entries = Entry.no_join.filter(end_time__isnull=False)
+        for index in range(0, len(ranges), self.RANGES_PER_QUERY):
+            chunk = ranges[index:index + self.RANGES_PER_QUERY]
+            self._rebuild(
+                rollups.filter(reduce(operator.or_, (
+                    Q(user=user_id, project=project_id, day__gte=start, day__lt=end)
+                    for user_id, project_id, start, end in chunk))),
+                entries.filter(reduce(operator.or_, (
+                    Q(user=user_id, project=project_id, end_time__gte=start,
+                      end_time__lt=end)
+                    for user_id, project_id, start, end in chunk))),
+                batch_size)
+
+    def _lock_users(self, users):
+        # Serialize concurrent rebuilds of the same users' rollups.
+        locked = User.objects.select_for_update().filter(pk__in=users)
+        list(locked.values_list('pk', flat=True))
+
+    def _rebuild(self, rollups, entries, batch_size):
+        """Replaces the rollups with those summed from the entries."""
+        entries = entries.annotate(day=DateTrunc('day', 'end_time'))
+        entries = entries.values('user', 'project', 'activity', 'status', 'day')
+        entries = entries.annotate(hours=Sum('hours')).order_by()
+
+        rollups.delete()
+        batch = []
+        for row in entries.iterator():
+            batch.append(self.model(
+                user_id=row['user'], project_id=row['project'],
+                activity_id=row['activity'], status=row['status'],
+                day=row['day'], hours=row['hours']))
+            if len(batch) >= batch_size:
+                self.bulk_create(batch)
+                batch = []
+        if batch:
+            self.bulk_create(batch)
+
+
+@python_2_unicode_compatible
+class EntryRollup(models.Model):
+    """
+    The hours of a user's entries on a project, summed for each activity,
+    status and day, so that reports need not scan every entry.
+
+    Rollups are kept up to date as entries are saved, deleted, updated or
+    bulk created, and can be rebuilt with the rebuild_rollups command, which
+    must be run after entries are changed with raw SQL.
+    """
+    user = models.ForeignKey(User, related_name='timepiece_entry_rollups')
+    project = models.ForeignKey('crm.Project', related_name='entry_rollups')
+    activity = models.ForeignKey(Activity, related_name='entry_rollups')
+    status = models.CharField(max_length=24, choices=Entry.STATUSES.items())
+    day = models.DateTimeField(
+        db_index=True, help_text='The start of the day the entries ended on.')
+    hours = models.DecimalField(max_digits=15, decimal_places=5, default=0)
+
+    objects = EntryRollupManager()
+
+    class Meta:
+        unique_together = ('user', 'project', 'activity', 'status', 'day')
+
+    def __str__(self):
+        return '%s on %s for %s' % (
+            self.user, self.project, self.day.strftime('%B %d, %Y'))
+
+
+class EntryRollupCoverage(models.Model):
+    """
+    A span of days for which the rollups have been rebuilt from the entries.
+    A missing start or end leaves the span unbounded on that side.
+    """
+    start = models.DateTimeField(blank=True, null=True)
+    end = models.DateTimeField(blank=True, null=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+
+@receiver([post_save, post_delete], sender=Entry)
+def invalidate_entry_caches(sender, instance, **kwargs):
+    """
+    The user's recent projects and dashboard change as their entries change,
+    as may the open entries when one is clocked in, clocked out or edited.
+    """
+    invalidate_user(QUICK_CLOCK_IN, instance.user_id)
+    invalidate_user(DASHBOARD, instance.user_id)
+    bump_version(ACTIVE_ENTRIES)
+
+
+@receiver([pre_save, pre_delete], sender=Entry)
+def read_entry_rollup(sender, instance, **kwargs):
+    """
+    Reads the rollup the entry is stored in, which may not be the one it was
+    loaded into if it has since been updated in bulk.
+    """
+    stored = None
+    if instance.pk is not None:
+        stored = Entry.no_join.filter(pk=instance.pk).values_list(*ROLLUP_FIELDS)
+        stored = stored.first()
+    instance._stored_rollup = stored
+
+
+@receiver(post_save, sender=Entry)
+def update_entry_rollups(sender, instance, **kwargs):
+    """
+    Rebuilds the days the entry was rolled up into before and after, unless
+    none of the fields it is rolled up by have changed.
+    """
+    rollup = tuple(getattr(instance, Entry._meta.get_field(name).attname)
+                   for name in ROLLUP_FIELDS)
+    stored = getattr(instance, '_stored_rollup', None)
+    if rollup != stored:
+        _rebuild_entry_rollups(stored, rollup)
+
+
+@receiver(post_delete, sender=Entry)
+def delete_entry_rollups(sender, instance, **kwargs):
+    _rebuild_entry_rollups(getattr(instance, '_stored_rollup', None))
+
+
+def _rebuild_entry_rollups(*rollups):
+    """Rebuilds the days of the given rollups, the ROLLUP_FIELDS of entries."""
+    rollups = [dict(zip(ROLLUP_FIELDS, rollup)) for rollup in rollups if rollup]
+    EntryRollup.objects.rebuild_keys(
+        (rollup['user'], rollup['project'], _get_day_start(rollup['end_time']))
+        for rollup in rollups if rollup['end_time'] is not None)
 
 
 @python_2_unicode_compatible
@@ -545,3 +911,9 @@ class ProjectHours(models.Model):
         verbose_name = 'project hours entry'
         verbose_name_plural = 'project hours entries'
         unique_together = ('week_start', 'project', 'user')
+
+
+@receiver([post_save, post_delete], sender=ProjectHours)
+def invalidate_project_hours_caches(sender, instance, **kwargs):
+    """The user's assigned hours are shown on their dashboard."""
+    invalidate_user(DASHBOARD, instance.user_id)
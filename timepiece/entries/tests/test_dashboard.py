@@ -1,13 +1,18 @@
 import datetime
+from decimal import Decimal
 import json
 
 from dateutil.relativedelta import relativedelta
 from six.moves.urllib.parse import urlencode
 
 from django.contrib.auth.models import Permission
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import TestCase
 from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from timepiece import utils
 from timepiece.tests.base import ViewTestMixin
@@ -21,6 +26,7 @@ class DashboardViewTestCase(ViewTestMixin, TestCase):
     """Tests the data that is passed to the dashboard template."""
 
     def setUp(self):
+        cache.clear()
         self.today = datetime.date(2012, 11, 7)
         self.this_week = utils.get_week_start(self.today)
         self.next_week = self.this_week + relativedelta(days=7)
@@ -38,6 +44,9 @@ class DashboardViewTestCase(ViewTestMixin, TestCase):
         self.location = factories.Location()
         self.status = Entry.UNVERIFIED
 
+    def tearDown(self):
+        cache.clear()
+
     def _create_entry(self, start_time, end_time=None, user=None):
         """
         Creates an entry using default values. If end time is not given, the
@@ -146,6 +155,38 @@ class DashboardViewTestCase(ViewTestMixin, TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['others_active_entries']), 0)
 
+    def test_other_active_entries_cached(self):
+        """Open entries are shared by every user until an entry changes."""
+        self._create_others_entries()
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            entries = Entry.objects.get_active_entries()
+            # Everything the dashboard shows of them is cached along with them.
+            for entry in entries:
+                entry.user.get_name_or_username()
+                str(entry.project)
+                entry.activity.name
+        self.assertEqual(len(entries), 5)
+
+    def test_other_active_entries_invalidated(self):
+        """Clocking in, editing or clocking out refreshes the open entries."""
+        self.client.get(self.url)
+        other = factories.User()
+        entry = self._create_entry(datetime.datetime(2012, 11, 6, 12), user=other)
+        response = self.client.get(self.url)
+        self.assertEqual(list(response.context['others_active_entries']), [entry])
+
+        entry.activity = factories.Activity()
+        entry.save()
+        response = self.client.get(self.url)
+        entries = response.context['others_active_entries']
+        self.assertEqual(entries[0].activity, entry.activity)
+
+        entry.end_time = entry.start_time + relativedelta(hours=1)
+        entry.save()
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['others_active_entries']), 0)
+
     def test_clock_in_form_activity_lookup(self):
         """Create an ActivityGroup that includes the Activity, and associate it with the project.
         Add a second Activity that is not included.  Ensure that the ActivityLookup disallows
@@ -275,3 +316,119 @@ class ProcessProgressTestCase(TestCase):
         self.assertEqual(progress[0]['project'], projects[0])
         self.assertEqual(progress[1]['project'], projects[1])
         self.assertEqual(progress[2]['project'], projects[2])
+
+    def test_open_entry(self):
+        """The open entry's hours are worked out as of now."""
+        self._create_entry(
+            datetime.datetime(2012, 11, 7, 8, 0), datetime.datetime(2012, 11, 7, 12, 0))
+        self._create_entry(timezone.now() - relativedelta(hours=2))
+        progress = self._get_progress()
+        self.assertEqual(len(progress), 1)
+        self.assertEqual(progress[0]['worked'].quantize(Decimal('0.01')), Decimal('6.00'))
+
+    def test_query_count(self):
+        """The number of queries does not depend on the number of projects."""
+        for i in range(5):
+            project = factories.Project()
+            start_time = datetime.datetime(2012, 11, 5, 8 + i)
+            self._create_entry(start_time, start_time + relativedelta(hours=1), project)
+            self._create_hours(5, project)
+        self._create_entry(timezone.now())
+        with self.assertNumQueries(4):
+            progress = self._get_progress()
+        self.assertEqual(len(progress), 6)
+
+
+class DashboardChangesTestCase(ViewTestMixin, TestCase):
+    url_name = 'dashboard_changes'
+
+    def setUp(self):
+        super(DashboardChangesTestCase, self).setUp()
+        cache.clear()
+        self.user = factories.User()
+        self.login_user(self.user)
+        self.week_start = utils.get_week_start(datetime.date(2012, 11, 7))
+        self.data = {'week_start': self.week_start.strftime('%Y-%m-%d')}
+        self.project = factories.Project()
+        self.start = datetime.datetime(2012, 11, 6, 9)
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_changes(self, version=None):
+        data = dict(self.data, version=version) if version else self.data
+        response = self._get(data=data)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_unauthenticated_user(self):
+        self.client.logout()
+        response = self._get()
+        self.assertEqual(response.status_code, 302)
+
+    def test_initial(self):
+        """Without a version, every part of the dashboard is returned."""
+        entry = factories.Entry(
+            user=self.user, project=self.project, start_time=self.start,
+            end_time=self.start + relativedelta(hours=2))
+        other = factories.Entry(start_time=self.start)
+        factories.ProjectHours(
+            user=self.user, project=self.project,
+            week_start=self.week_start.date(), hours=5)
+        data = self.get_changes()
+        self.assertEqual(data['week_start'], '2012-11-05')
+        self.assertEqual(data['active_entry'], None)
+        self.assertEqual(data['total_assigned'], 40)
+        self.assertEqual(data['total_worked'], 2)
+        self.assertEqual(data['project_progress'], [{
+            'project': entry.project_id,
+            'name': self.project.name,
+            'assigned': 5,
+            'worked': 2,
+        }])
+        self.assertEqual(len(data['others_active_entries']), 1)
+        self.assertEqual(data['others_active_entries'][0]['activity'],
+                         other.activity.name)
+
+    def test_unchanged(self):
+        """Polling with the current version costs no queries."""
+        version = self.get_changes()['version']
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_changes(version)
+        self.assertEqual(data, {'version': version})
+        # Only the session and user are read, to authenticate the request.
+        self.assertFalse([q for q in queries if 'timepiece_' in q['sql']])
+
+    def test_own_changes(self):
+        """The user's entries change only their own parts of the dashboard."""
+        version = self.get_changes()['version']
+        factories.ProjectHours(
+            user=self.user, project=self.project,
+            week_start=self.week_start.date(), hours=5)
+        data = self.get_changes(version)
+        self.assertNotEqual(data['version'], version)
+        self.assertEqual(data['project_progress'][0]['assigned'], 5)
+        self.assertEqual(data['active_entry'], None)
+
+        entry = factories.Entry(user=self.user, start_time=self.start)
+        data = self.get_changes(data['version'])
+        self.assertEqual(data['active_entry']['id'], entry.pk)
+        # The user's own entry is also an open entry for everyone else.
+        self.assertEqual(data['others_active_entries'], [])
+
+    def test_others_changes(self):
+        """Others' entries change only the open entries."""
+        user, activity = factories.User(), factories.Activity()
+        version = self.get_changes()['version']
+        factories.Entry(
+            user=user, project=self.project, activity=activity,
+            start_time=self.start)
+        data = self.get_changes(version)
+        self.assertEqual(sorted(data), ['others_active_entries', 'version'])
+        self.assertEqual(len(data['others_active_entries']), 1)
+
+    def test_week_changed(self):
+        version = self.get_changes()['version']
+        self.data['week_start'] = '2012-11-12'
+        data = self.get_changes(version)
+        self.assertEqual(data['week_start'], '2012-11-12')
@@ -0,0 +1,161 @@
+import datetime
+import json
+
+from dateutil.relativedelta import relativedelta
+import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+
+from timepiece.tests.base import ViewTestMixin
+from timepiece.tests import factories
+from timepiece.entries.models import Entry
+
+
+class EntryExportTestCase(ViewTestMixin, TestCase):
+    url_name = 'export_entries'
+
+    def setUp(self):
+        super(EntryExportTestCase, self).setUp()
+        self.user = factories.User(permissions=['entries.view_entry_summary'])
+        self.login_user(self.user)
+        self.start = datetime.datetime(2016, 3, 1, 9)
+        self.entries = [
+            factories.Entry(
+                start_time=self.start + relativedelta(days=day),
+                end_time=self.start + relativedelta(days=day, hours=2))
+            for day in range(5)]
+
+    def get_rows(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_no_permission(self):
+        self.login_user(factories.User())
+        response = self._get()
+        self.assertEqual(response.status_code, 302)
+
+    def test_export(self):
+        rows = self.get_rows(self._get())
+        self.assertEqual([row['id'] for row in rows], [e.pk for e in self.entries])
+        entry = self.entries[0]
+        self.assertEqual(rows[0]['user'], entry.user_id)
+        self.assertEqual(rows[0]['project'], entry.project_id)
+        self.assertEqual(rows[0]['start_time'], '2016-03-01T09:00:00')
+        self.assertEqual(rows[0]['hours'], 2)
+        self.assertEqual(rows[0]['status'], Entry.UNVERIFIED)
+
+    def test_pages(self):
+        """Full pages link to the next page, which starts after their last id."""
+        response = self._get(data={'limit': 2})
+        rows = self.get_rows(response)
+        self.assertEqual([row['id'] for row in rows], [e.pk for e in self.entries[:2]])
+        url, rel = response['Link'].split('; ')
+        self.assertEqual(rel, 'rel="next"')
+        self.assertIn('after={0}'.format(self.entries[1].pk), url)
+
+        response = self._get(data={'limit': 3, 'after': self.entries[1].pk})
+        rows = self.get_rows(response)
+        self.assertEqual([row['id'] for row in rows], [e.pk for e in self.entries[2:]])
+        self.assertIn('Link', response)
+
+        response = self._get(data={'limit': 3, 'after': self.entries[-1].pk})
+        self.assertEqual(self.get_rows(response), [])
+        self.assertNotIn('Link', response)
+
+    def test_updated_since(self):
+        since = datetime.datetime(2016, 4, 1)
+        Entry.no_join.filter(pk=self.entries[3].pk).update(date_updated=since)
+        Entry.no_join.exclude(pk=self.entries[3].pk).update(
+            date_updated=since - relativedelta(seconds=1))
+        rows = self.get_rows(self._get(data={'updated_since': since.isoformat()}))
+        self.assertEqual([row['id'] for row in rows], [self.entries[3].pk])
+
+    def test_query_count(self):
+        """A page is read with one query, and streamed without any more."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self._get(data={'limit': 2})
+        entry_queries = [q for q in queries if 'timepiece_entry' in q['sql']]
+        self.assertEqual(len(entry_queries), 1)
+        with self.assertNumQueries(0):
+            self.get_rows(response)
+
+    def test_invalid(self):
+        response = self._get(data={'limit': 0, 'updated_since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        errors = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(sorted(errors), ['limit', 'updated_since'])
+
+
+class EntryChangesTestCase(ViewTestMixin, TestCase):
+    url_name = 'entry_changes'
+
+    def setUp(self):
+        super(EntryChangesTestCase, self).setUp()
+        self.user = factories.User(permissions=['entries.view_entry_summary'])
+        self.login_user(self.user)
+        start = datetime.datetime(2016, 3, 1, 9)
+        self.entries = [
+            factories.Entry(start_time=start, end_time=start + relativedelta(hours=1))
+            for i in range(4)]
+        # Two entries changed at the same time, which pages must not split.
+        self.changed = datetime.datetime(2016, 4, 1, 12)
+        for i, entry in enumerate(self.entries):
+            Entry.no_join.filter(pk=entry.pk).update(
+                date_updated=self.changed + relativedelta(seconds=min(i, 2)))
+
+    def get_page(self, **data):
+        response = self._get(data=data)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        ids = [json.loads(line)['id'] for line in content.splitlines()]
+        return ids, response['X-Next-Cursor']
+
+    def test_feed(self):
+        """Paging through the feed returns every change once, in order."""
+        ids, cursor = self.get_page(limit=3)
+        self.assertEqual(ids, [e.pk for e in self.entries[:3]])
+        ids, cursor = self.get_page(limit=3, cursor=cursor)
+        self.assertEqual(ids, [self.entries[3].pk])
+        ids, next_cursor = self.get_page(limit=3, cursor=cursor)
+        self.assertEqual(ids, [])
+        self.assertEqual(next_cursor, cursor)
+
+    def test_bulk_update(self):
+        """Entries changed by a bulk update reappear in the feed."""
+        ids, cursor = self.get_page()
+        self.assertEqual(len(ids), 4)
+        updated = Entry.no_join.filter(pk=self.entries[1].pk)
+        updated.update(status=Entry.APPROVED)
+        with self.settings(TIMEPIECE_ENTRY_CHANGES_LAG=0):
+            ids, cursor = self.get_page(cursor=cursor)
+        self.assertEqual(ids, [self.entries[1].pk])
+
+    def test_late_commit(self):
+        """
+        A change committed after later changes have been read is not skipped
+        if it commits within the lag.
+        """
+        ids, cursor = self.get_page()
+        now = timezone.now()
+        # Saved 10 seconds ago and committed.
+        Entry.no_join.filter(pk=self.entries[0].pk).update(
+            date_updated=now - relativedelta(seconds=10))
+        with self.settings(TIMEPIECE_ENTRY_CHANGES_LAG=60):
+            ids, cursor = self.get_page(cursor=cursor)
+            self.assertEqual(ids, [])
+            # Saved 30 seconds ago, but only now committed.
+            Entry.no_join.filter(pk=self.entries[1].pk).update(
+                date_updated=now - relativedelta(seconds=30))
+            later = now + relativedelta(seconds=60)
+            with mock.patch('django.utils.timezone.now', return_value=later):
+                ids, cursor = self.get_page(cursor=cursor)
+        self.assertEqual(ids, [self.entries[1].pk, self.entries[0].pk])
+
+    def test_invalid_cursor(self):
+        response = self._get(data={'cursor': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
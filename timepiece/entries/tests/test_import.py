@@ -0,0 +1,221 @@
+import datetime
+from decimal import Decimal
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from dateutil.relativedelta import relativedelta
+import mock
+import six
+
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from timepiece.tests import factories
+from timepiece.entries.importers import EntryImporter, read_csv, read_ndjson
+from timepiece.entries.models import Entry, EntryRollup
+
+
+class EntryImporterTestCase(TestCase):
+
+    def setUp(self):
+        self.user = factories.User()
+        self.project = factories.Project()
+        self.activity = factories.Activity()
+        self.location = factories.Location()
+        self.start = datetime.datetime(2016, 3, 1, 9)
+
+    def make_row(self, start, end, **kwargs):
+        """Returns a row from ``start`` to ``end`` hours past 9am."""
+        row = {
+            'user': self.user.pk,
+            'project': self.project.pk,
+            'activity': self.activity.pk,
+            'location': self.location.pk,
+            'start_time': (self.start + relativedelta(hours=start)).isoformat(),
+            'end_time': (self.start + relativedelta(hours=end)).isoformat(),
+        }
+        row.update(kwargs)
+        return row
+
+    def run_import(self, rows, **kwargs):
+        importer = EntryImporter(**kwargs)
+        importer.run(enumerate(rows, 1))
+        return importer
+
+    def test_import(self):
+        importer = self.run_import([
+            self.make_row(0, 2, seconds_paused=1800, comments='Planning'),
+            self.make_row(2.5, 4, status=Entry.APPROVED),
+        ])
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(importer.created, 2)
+        first, second = Entry.objects.order_by('start_time')
+        self.assertEqual(first.end_time, self.start + relativedelta(hours=2))
+        self.assertEqual(first.hours, Decimal('1.5'))
+        self.assertEqual(first.comments, 'Planning')
+        self.assertEqual(first.status, Entry.UNVERIFIED)
+        self.assertEqual(second.hours, Decimal('1.5'))
+        self.assertEqual(second.status, Entry.APPROVED)
+        # The hours match those Entry.save would have computed.
+        second.save()
+        self.assertEqual(Entry.objects.get(pk=second.pk).hours, Decimal('1.5'))
+        rollups = EntryRollup.objects.values_list('status', 'hours')
+        self.assertEqual(sorted(rollups), [
+            (Entry.APPROVED, Decimal('1.5')), (Entry.UNVERIFIED, Decimal('1.5'))])
+
+    def test_invalid_rows(self):
+        """Invalid rows are reported by number and skipped."""
+        group = factories.ActivityGroup()
+        group.activities.add(self.activity)
+        restricted = factories.Project(activity_group=group)
+        importer = self.run_import([
+            self.make_row(0, 1, user=''),
+            self.make_row(0, 1, start_time='yesterday'),
+            self.make_row(0, 1, project=0),
+            self.make_row(1, 0),
+            self.make_row(0, 13),
+            self.make_row(0, 1, status='lost'),
+            self.make_row(
+                0, 1, project=restricted.pk, activity=factories.Activity().pk),
+            None,
+            self.make_row(0, 1, project=restricted.pk),
+        ])
+        self.assertEqual(importer.created, 1)
+        self.assertEqual([number for number, messages in importer.errors],
+                         list(range(1, 9)))
+        messages = dict(importer.errors)
+        self.assertEqual(messages[1], ['user is required.'])
+        self.assertEqual(messages[3], ['project 0 does not exist.'])
+        self.assertIn('not allowed for this project', messages[7][0])
+
+    def test_overlaps(self):
+        """Entries may not overlap each other or saved entries."""
+        factories.Entry(
+            user=self.user, start_time=self.start,
+            end_time=self.start + relativedelta(hours=1))
+        importer = self.run_import([
+            self.make_row(0.5, 1.5),
+            self.make_row(2, 3),
+            self.make_row(2.5, 3.5),
+            self.make_row(0.5, 1.5, user=factories.User().pk),
+        ])
+        self.assertEqual([number for number, messages in importer.errors], [1, 3])
+        self.assertIn('Start time overlaps', importer.errors[0][1][0])
+        self.assertEqual(importer.created, 2)
+
+    def test_overlaps_between_chunks(self):
+        importer = self.run_import(
+            [self.make_row(0, 1), self.make_row(2, 3), self.make_row(0.5, 1.5)],
+            chunk_size=2)
+        self.assertEqual([number for number, messages in importer.errors], [3])
+        self.assertEqual(importer.created, 2)
+
+    def test_overlaps_chunk_size(self):
+        """The first of overlapping rows is kept, whatever the chunk size."""
+        rows = [self.make_row(0, 1.5), self.make_row(1, 2.5), self.make_row(2, 3)]
+        for chunk_size in (1, 2, 3):
+            importer = self.run_import(rows, chunk_size=chunk_size)
+            self.assertEqual(
+                [number for number, messages in importer.errors], [2], chunk_size)
+            starts = Entry.no_join.order_by('start_time').values_list(
+                'start_time', flat=True)
+            self.assertEqual(list(starts), [
+                self.start, self.start + relativedelta(hours=2)])
+            Entry.objects.all().delete()
+
+    def test_failed_chunk(self):
+        """The rollups of chunks created before a failure are rebuilt."""
+        import_chunk = EntryImporter.import_chunk
+        chunks = []
+
+        def fail_second_chunk(importer, rows):
+            chunks.append(rows)
+            if len(chunks) == 2:
+                raise DatabaseError
+            return import_chunk(importer, rows)
+
+        rows = [self.make_row(0, 1), self.make_row(2, 3)]
+        with mock.patch.object(EntryImporter, 'import_chunk', fail_second_chunk):
+            with self.assertRaises(DatabaseError):
+                self.run_import(rows, chunk_size=1)
+        self.assertEqual(Entry.objects.count(), 1)
+        self.assertEqual(EntryRollup.objects.get().hours, Decimal('1'))
+
+    def test_query_count(self):
+        """A chunk is validated and created with a fixed number of queries."""
+        with CaptureQueriesContext(connection) as few:
+            self.run_import([self.make_row(0, 1)])
+        Entry.objects.all().delete()
+        with CaptureQueriesContext(connection) as many:
+            self.run_import([self.make_row(i, i + 0.5) for i in range(20)])
+        self.assertEqual(Entry.objects.count(), 20)
+        self.assertEqual(len(many), len(few))
+
+    def test_read_csv(self):
+        lines = six.StringIO('user,project\n1,2\n\n3,4\n')
+        self.assertEqual(list(read_csv(lines)), [
+            (2, {'user': '1', 'project': '2'}),
+            (4, {'user': '3', 'project': '4'}),
+        ])
+
+    def test_read_ndjson(self):
+        lines = ['{"user": 1}\n', '\n', 'yesterday\n']
+        self.assertEqual(list(read_ndjson(lines)), [(1, {'user': 1}), (3, None)])
+
+
+class ImportEntriesCommandTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.entry = factories.Entry(
+            start_time=datetime.datetime(2016, 3, 1, 9),
+            end_time=datetime.datetime(2016, 3, 1, 11))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def call(self, *args, **kwargs):
+        stdout, stderr = six.StringIO(), six.StringIO()
+        call_command('import_entries', *args, stdout=stdout, stderr=stderr, **kwargs)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_exported_ndjson(self):
+        """Entries can be imported from the entry export."""
+        row = Entry.no_join.values(
+            'id', 'user', 'project', 'activity', 'location', 'start_time',
+            'end_time', 'hours', 'comments').get()
+        row['start_time'] = row['start_time'].isoformat()
+        row['end_time'] = row['end_time'].isoformat()
+        row['hours'] = float(row['hours'])
+        self.entry.delete()
+        path = self.write('entries.ndjson', u'{0}\n{{\n'.format(json.dumps(row)))
+        stdout, stderr = self.call(path)
+        self.assertEqual(stdout.strip(), 'Imported 1 entries, skipped 1 rows')
+        self.assertIn('Line 2:', stderr)
+        entry = Entry.objects.get()
+        self.assertEqual(entry.hours, Decimal('2'))
+        self.assertEqual(entry.project_id, row['project'])
+
+    def test_csv(self):
+        entry = self.entry
+        path = self.write('entries.txt', (
+            u'user,project,activity,location,start_time,end_time,comments\n'
+            u'{0},{1},{2},{3},2016-03-02T09:00,2016-03-02T10:00,Caf\xe9\n'
+            u'{0},{1},{2},{3},2016-03-01T10:00,2016-03-01T12:00,\n').format(
+                entry.user_id, entry.project_id, entry.activity_id,
+                entry.location_id))
+        stdout, stderr = self.call(path, format='csv')
+        self.assertEqual(stdout.strip(), 'Imported 1 entries, skipped 1 rows')
+        self.assertIn('Line 3: Start time overlaps', stderr)
+        self.assertEqual(Entry.objects.latest('start_time').comments, u'Caf\xe9')
@@ -0,0 +1,224 @@
+import datetime
+
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+import mock
+import six
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from timepiece.entries.models import Entry, EntryRollup, EntryRollupCoverage
+from timepiece.reports.tests.base import ReportsTestBase
+from timepiece.tests import factories
+from timepiece.tests.base import ViewTestMixin, LogTimeMixin
+
+
+class EntryRollupTestCase(TestCase):
+
+    def setUp(self):
+        super(EntryRollupTestCase, self).setUp()
+        self.user = factories.User()
+        self.project = factories.Project()
+        self.day = datetime.datetime(2015, 3, 2)
+
+    def create_entry(self, hours_after=9, hours=1, **kwargs):
+        start = self.day + relativedelta(hours=hours_after)
+        kwargs.setdefault('user', self.user)
+        kwargs.setdefault('project', self.project)
+        return factories.Entry(
+            start_time=start, end_time=start + relativedelta(hours=hours),
+            **kwargs)
+
+    def get_rollups(self):
+        rollups = EntryRollup.objects.order_by(
+            'user_id', 'project_id', 'activity_id', 'status', 'day')
+        return list(rollups.values_list(
+            'user', 'project', 'activity', 'status', 'day', 'hours'))
+
+    def assertRebuilt(self):
+        """The incrementally updated rollups match a full rebuild."""
+        rollups = self.get_rollups()
+        EntryRollup.objects.rebuild()
+        self.assertEqual(rollups, self.get_rollups())
+        return rollups
+
+    def test_save(self):
+        entry = self.create_entry(hours=2)
+        self.create_entry(hours_after=12, activity=entry.activity)
+        self.create_entry(hours_after=24)
+        rollups = self.assertRebuilt()
+        self.assertEqual([r[-1] for r in rollups], [3, 1])
+
+    def test_open_entry(self):
+        """Entries are rolled up only once they are closed."""
+        entry = self.create_entry()
+        entry.end_time = None
+        entry.save()
+        self.assertEqual(self.get_rollups(), [])
+        entry.end_time = entry.start_time + relativedelta(hours=3)
+        entry.save()
+        self.assertEqual([r[-1] for r in self.assertRebuilt()], [3])
+
+    def test_move(self):
+        """Moving an entry updates the rollups it left as well as joined."""
+        entry = self.create_entry()
+        self.create_entry(hours_after=12, activity=entry.activity)
+        entry = Entry.objects.get(pk=entry.pk)
+        entry.start_time += relativedelta(days=3)
+        entry.end_time += relativedelta(days=3)
+        entry.user = factories.User()
+        entry.project = factories.Project()
+        entry.save()
+        self.assertEqual(len(self.assertRebuilt()), 2)
+
+    def test_delete(self):
+        entry = self.create_entry()
+        self.create_entry(hours_after=24)
+        Entry.objects.get(pk=entry.pk).delete()
+        self.assertEqual(len(self.assertRebuilt()), 1)
+
+    def test_update_status(self):
+        entries = [self.create_entry(hours_after=hours) for hours in (9, 12, 36)]
+        updated = Entry.no_join.filter(pk__in=[e.pk for e in entries[1:]])
+        self.assertEqual(updated.update(status=Entry.APPROVED), 2)
+        rollups = self.assertRebuilt()
+        self.assertEqual(
+            sorted(r[3] for r in rollups),
+            [Entry.APPROVED, Entry.APPROVED, Entry.UNVERIFIED])
+
+    def test_update(self):
+        """Bulk updates of the fields entries are rolled up by rebuild them."""
+        entries = [self.create_entry(hours_after=hours) for hours in (9, 12, 36)]
+        open_entry = self.create_entry(hours_after=60)
+        Entry.no_join.filter(pk=open_entry.pk).update(end_time=None)
+        self.assertEqual(len(self.assertRebuilt()), 3)
+        updated = Entry.no_join.filter(pk__in=[e.pk for e in entries[1:]])
+        updated.update(project=factories.Project(), hours=Decimal('2'))
+        self.assertEqual(len(self.assertRebuilt()), 3)
+        Entry.no_join.filter(pk=entries[0].pk).update(
+            end_time=self.day + relativedelta(days=5, hours=10))
+        self.assertEqual(len(self.assertRebuilt()), 3)
+        Entry.no_join.filter(pk=open_entry.pk).update(
+            end_time=open_entry.start_time + relativedelta(hours=1))
+        self.assertEqual(len(self.assertRebuilt()), 4)
+
+    def test_bulk_create(self):
+        entry = self.create_entry()
+        Entry.no_join.bulk_create([
+            factories.Entry.build(
+                user=self.user, project=self.project, activity=entry.activity,
+                location=entry.location,
+                start_time=self.day + relativedelta(hours=hours),
+                end_time=self.day + relativedelta(hours=hours + 1), hours=1)
+            for hours in (12, 36)])
+        rollups = self.assertRebuilt()
+        self.assertEqual([r[-1] for r in rollups], [2, 1])
+
+    def test_bulk_create_scattered_days(self):
+        """Only the days entries are created on are rebuilt."""
+        between = self.create_entry(hours_after=24 * 100)
+        EntryRollup.objects.filter(project=between.project).delete()
+        days = (0, 1, 2, 200, 400)
+        with mock.patch.object(EntryRollup.objects, 'RANGES_PER_QUERY', 2):
+            Entry.no_join.bulk_create([
+                factories.Entry.build(
+                    user=self.user, project=self.project, activity=between.activity,
+                    location=between.location,
+                    start_time=self.day + relativedelta(days=day, hours=9),
+                    end_time=self.day + relativedelta(days=day, hours=10), hours=1)
+                for day in days])
+        # The deleted rollup of the day in between is not rebuilt.
+        self.assertEqual([r[4:] for r in self.get_rollups()], [
+            (self.day + relativedelta(days=day), 1) for day in days])
+
+    def test_save_after_update(self):
+        """An entry saved after a bulk update rebuilds its stored rollup."""
+        entry = Entry.objects.get(pk=self.create_entry().pk)
+        Entry.no_join.filter(pk=entry.pk).update(project=factories.Project())
+        self.assertRebuilt()
+        entry.save()
+        self.assertEqual([r[1] for r in self.assertRebuilt()], [self.project.pk])
+        Entry.no_join.filter(pk=entry.pk).update(hours=Decimal('3'))
+        entry.refresh_from_db()
+        entry.comments = 'Reviewed'
+        entry.end_time += relativedelta(hours=1)
+        entry.save()
+        self.assertEqual([r[-1] for r in self.assertRebuilt()], [2])
+
+    def test_unchanged_save(self):
+        """Saving an entry without changing its rollup rebuilds nothing."""
+        entry = Entry.objects.get(pk=self.create_entry().pk)
+        entry.comments = 'Reviewed'
+        with mock.patch.object(EntryRollup.objects, 'rebuild') as rebuild:
+            entry.save()
+        self.assertFalse(rebuild.called)
+
+    def test_rebuild_command(self):
+        self.create_entry()
+        self.create_entry(hours_after=48)
+        EntryRollup.objects.all().delete()
+        self.assertFalse(EntryRollup.objects.covers(self.day, self.day))
+        out = six.StringIO()
+        call_command('rebuild_rollups', **{'from': '2015-03-04', 'stdout': out})
+        self.assertEqual(out.getvalue().strip(), 'Rebuilt 1 rollups')
+        self.assertEqual(len(self.get_rollups()), 1)
+        self.assertTrue(EntryRollup.objects.covers(
+            self.day + relativedelta(days=2), self.day + relativedelta(days=30)))
+        self.assertFalse(EntryRollup.objects.covers(
+            self.day, self.day + relativedelta(days=30)))
+        call_command('rebuild_rollups', verbosity=0)
+        self.assertEqual(len(self.get_rollups()), 2)
+        self.assertTrue(EntryRollup.objects.covers(self.day, self.day))
+
+
+class HourlyReportRollupTestCase(ViewTestMixin, LogTimeMixin, ReportsTestBase):
+    url_name = 'report_hourly'
+
+    def get_summaries(self, **kwargs):
+        self.login_user(self.superuser)
+        data = {
+            'from_date': '2011-01-02',
+            'to_date': '2011-01-20',
+            'billable': True,
+            'non_billable': True,
+            'paid_leave': kwargs.pop('paid_leave', True),
+            'trunc': 'week',
+        }
+        data.update(kwargs)
+        context = self._get(data=data).context
+        summaries = [(title, list(totals))
+                     for title, totals in context['summaries'].items()]
+        return context['entries'].model, summaries
+
+    def test_matches_entries(self):
+        """The report is the same whether it reads entries or rollups."""
+        self.make_entries()
+        self.make_entries(user=self.user2, hours=2)
+        self.log_time(project=self.sick, start=self.default_dates[0])
+        for trunc in ('day', 'week', 'month'):
+            for paid_leave in (True, False):
+                model, expected = self.get_summaries(
+                    trunc=trunc, paid_leave=paid_leave)
+                self.assertEqual(model, Entry)
+                EntryRollupCoverage.objects.create()
+                model, summaries = self.get_summaries(
+                    trunc=trunc, paid_leave=paid_leave)
+                self.assertEqual(model, EntryRollup)
+                self.assertEqual(summaries, expected)
+                EntryRollupCoverage.objects.all().delete()
+
+    def test_bulk_update(self):
+        """A bulk update of entries cannot leave the rollups out of sync."""
+        self.make_entries()
+        self.make_entries(user=self.user2, hours=2)
+        EntryRollupCoverage.objects.create()
+        Entry.no_join.filter(user=self.user2).update(
+            project=self.sick, hours=Decimal('3'))
+        model, summaries = self.get_summaries()
+        self.assertEqual(model, EntryRollup)
+        EntryRollupCoverage.objects.all().delete()
+        model, expected = self.get_summaries()
+        self.assertEqual(model, Entry)
+        self.assertEqual(summaries, expected)
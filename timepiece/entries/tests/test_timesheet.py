@@ -1842,6 +1842,37 @@ class TestTotals(ViewTestMixin, LogTimeMixin, TestCase):
                         self.assertEqual(totals['billable'], 1)
                         self.assertEqual(totals['total'], 1)
 
+    def log_summary_time(self, user):
+        """Logs 1 billable, 2 non-billable, 4 invoiced and 8 leave hours."""
+        if not hasattr(self, 'sick'):
+            self.sick = factories.Project(name='Sick')
+        start = utils.add_timezone(datetime.datetime(2011, 1, 3, 8))
+        self.log_time(project=self.p1, start=start, delta=(1, 0), user=user)
+        self.log_time(project=self.p2, start=start + relativedelta(hours=1),
+                      delta=(2, 0), user=user)
+        self.log_time(project=self.p4, start=start + relativedelta(hours=3),
+                      delta=(4, 0), status=Entry.INVOICED, user=user)
+        self.log_time(project=self.sick, start=start + relativedelta(days=1),
+                      delta=(8, 0), billable=False, user=user)
+        return {
+            'billable': Decimal(5), 'non_billable': Decimal(2),
+            'invoiced': Decimal(4), 'uninvoiced': Decimal(11),
+            'total': Decimal(15), 'total_worked': Decimal(7),
+            'paid_leave': {'sick': Decimal(8), 'vacation': None},
+        }
+
+    def testSummary(self):
+        """All summary hours are computed in one query."""
+        expected = self.log_summary_time(self.user)
+        self.log_summary_time(self.user2)
+        from_date = utils.add_timezone(datetime.datetime(2011, 1, 1))
+        to_date = from_date + relativedelta(months=1)
+        projects = {'sick': self.sick.pk, 'vacation': self.p3.pk}
+        with self.settings(TIMEPIECE_PAID_LEAVE_PROJECTS=projects):
+            with self.assertNumQueries(1):
+                summary = Entry.summary(self.user, from_date, to_date)
+        self.assertEqual(summary, expected)
+
 
 class HourlySummaryTest(ViewTestMixin, TestCase):
 
@@ -7,6 +7,9 @@ urlpatterns = [
     url(r'^dashboard/(?:(?P<active_tab>progress|all-entries|online-users)/)?$',
         views.Dashboard.as_view(),
         name='dashboard'),
+    url(r'^dashboard/changes/$',
+        views.DashboardChanges.as_view(),
+        name='dashboard_changes'),
 
     # Active entry
     url(r'^entry/clock_in/$',
@@ -33,6 +36,13 @@ urlpatterns = [
         views.delete_entry,
         name='delete_entry'),
 
+    url(r'^entry/export/$',
+        views.export_entries,
+        name='export_entries'),
+    url(r'^entry/changes/$',
+        views.entry_changes,
+        name='entry_changes'),
+
     # Schedule
     url(r'^schedule/$',
         views.ScheduleView.as_view(),
@@ -4,6 +4,7 @@ from dateutil.relativedelta import relativedelta
 from decimal import Decimal
 from itertools import groupby
 import json
+import uuid
 
 from six.moves.urllib.parse import urlencode
 
@@ -14,21 +15,26 @@ from django.contrib.contenttypes.models import ContentType
 from django.core import exceptions
 from django.core.urlresolvers import reverse
 from django.db import transaction
-from django.db.models import Q
-from django.http import HttpResponse, HttpResponseRedirect, Http404
+from django.db.models import Q, Sum
+from django.http import (
+    HttpResponse, HttpResponseRedirect, Http404, StreamingHttpResponse)
 from django.shortcuts import redirect, render
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView, View
 
 from timepiece import utils
 from timepiece.forms import DATE_FORM_FORMAT
+from timepiece.utils.cache import (
+    ACTIVE_ENTRIES, DASHBOARD, bump_version, get_user_value, get_version)
 from timepiece.utils.csv import DecimalEncoder
+from timepiece.utils.export import ExportEncoder
 from timepiece.utils.views import cbv_decorator
 
 from timepiece.crm.models import Project, UserProfile
 from timepiece.entries.forms import (
-    ClockInForm, ClockOutForm, AddUpdateEntryForm, ProjectHoursForm,
-    ProjectHoursSearchForm)
+    ClockInForm, ClockOutForm, AddUpdateEntryForm, EntryChangesForm,
+    EntryExportForm, ProjectHoursForm, ProjectHoursSearchForm)
 from timepiece.entries.models import Entry, ProjectHours
 
 
@@ -69,21 +75,15 @@ class Dashboard(TemplateView):
         active_entry = utils.get_active_entry(self.user)
 
         # Process this week's entries to determine assignment progress.
-        week_entries = Entry.objects.filter(user=self.user)
-        week_entries = week_entries.timespan(week_start, span='week', current=True)
-        week_entries = week_entries.select_related('project')
-        assignments = ProjectHours.objects.filter(
-            user=self.user, week_start=week_start.date())
-        project_progress = self.process_progress(week_entries, assignments)
+        week_entries = self.get_week_entries(week_start)
+        project_progress = self.get_progress(week_entries, week_start)
 
         # Total hours that the user is expected to clock this week.
         total_assigned = self.get_hours_per_week(self.user)
         total_worked = sum([p['worked'] for p in project_progress])
 
         # Others' active entries.
-        others_active_entries = Entry.objects.filter(end_time__isnull=True)
-        others_active_entries = others_active_entries.exclude(user=self.user)
-        others_active_entries = others_active_entries.select_related('user', 'project', 'activity')
+        others_active_entries = self.get_others_active_entries()
 
         return {
             'active_tab': self.active_tab,
@@ -98,35 +98,49 @@ class Dashboard(TemplateView):
             'others_active_entries': others_active_entries,
         }
 
+    def get_week_entries(self, week_start):
+        week_entries = Entry.objects.filter(user=self.user)
+        week_entries = week_entries.timespan(week_start, span='week', current=True)
+        return week_entries.select_related('project')
+
+    def get_progress(self, week_entries, week_start):
+        assignments = ProjectHours.objects.filter(
+            user=self.user, week_start=week_start.date())
+        return self.process_progress(week_entries, assignments)
+
+    def get_others_active_entries(self):
+        return [entry for entry in Entry.objects.get_active_entries()
+                if entry.user_id != self.user.pk]
+
     def process_progress(self, entries, assignments):
         """
         Returns a list of progress summary data (pk, name, hours worked, and
         hours assigned) for each project either worked or assigned.
         The list is ordered by project name.
         """
-        # Determine all projects either worked or assigned.
-        project_q = Q(id__in=assignments.values_list('project__id', flat=True))
-        project_q |= Q(id__in=entries.values_list('project__id', flat=True))
-        projects = Project.objects.filter(project_q).select_related('business')
+        # Hours assigned to each project.
+        assigned = dict(assignments.values_list('project', 'hours'))
+
+        # Hours worked on each project. The database sums the stored hours of
+        # closed entries; only open entries are worked out as of now.
+        worked = entries.filter(end_time__isnull=False).order_by()
+        worked = worked.values('project').annotate(total=Sum('hours'))
+        worked = dict(worked.values_list('project', 'total'))
+        for entry in entries.filter(end_time__isnull=True).order_by():
+            hours = Decimal('%.5f' % (entry.get_total_seconds() / 3600.0))
+            worked[entry.project_id] = worked.get(entry.project_id, 0) + hours
 
-        # Hours per project.
+        # Determine all projects either worked or assigned.
+        project_ids = set(assigned) | set(worked)
+        projects = Project.objects.filter(pk__in=project_ids).select_related('business')
         project_data = {}
         for project in projects:
-            try:
-                assigned = assignments.get(project__id=project.pk).hours
-            except ProjectHours.DoesNotExist:
-                assigned = Decimal('0.00')
             project_data[project.pk] = {
                 'project': project,
-                'assigned': assigned,
-                'worked': Decimal('0.00'),
+                'assigned': assigned.get(project.pk, Decimal('0.00')),
+                'worked': worked.get(project.pk, Decimal('0.00')),
             }
 
-        for entry in entries:
-            pk = entry.project_id
-            hours = Decimal('%.5f' % (entry.get_total_seconds() / 3600.0))
-            project_data[pk]['worked'] += hours
-
         # Sort by maximum of worked or assigned hours (highest first).
         key = lambda x: x['project'].name.lower()
         project_progress = sorted(project_data.values(), key=key)
@@ -134,6 +148,71 @@ class Dashboard(TemplateView):
         return project_progress
 
 
+class DashboardChanges(Dashboard):
+    """
+    Returns the parts of the dashboard which changed since the version token
+    given by the client, as JSON, so that an open dashboard can be kept up
+    to date by polling rather than reloading.
+
+    The token combines the version of everyone's open entries with a token
+    for the user's own dashboard, which their entries, assignments and
+    profile invalidate. Parts which have not changed are left out, so when
+    nothing has changed a poll costs a few cache lookups. Hours worked are
+    as of the response; clients count up from them while an entry is open.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        return super(DashboardChanges, self).dispatch(request, None, *args, **kwargs)
+
+    def get_version(self, week_start):
+        others = get_version(ACTIVE_ENTRIES)
+        own = get_user_value(DASHBOARD, self.user.pk, lambda: uuid.uuid4().hex)
+        return '{0}.{1}.{2:%Y%m%d}'.format(others, own, week_start)
+
+    def get(self, request, *args, **kwargs):
+        today, week_start, week_end = self.get_dates()
+        # Read the version before the data, so that a change made while the
+        # data is read is picked up by the next poll.
+        version = self.get_version(week_start)
+        since = request.GET.get('version', '').split('.')
+        current = version.split('.')
+        data = {'version': version}
+        if since[:1] != current[:1]:
+            data['others_active_entries'] = [{
+                'user': entry.user.get_name_or_username(),
+                'project': str(entry.project),
+                'activity': entry.activity.name,
+                'start_time': entry.start_time,
+            } for entry in self.get_others_active_entries()]
+        if since[1:] != current[1:]:
+            active_entry = utils.get_active_entry(self.user)
+            if active_entry:
+                active_entry = {
+                    'id': active_entry.pk,
+                    'project': str(active_entry.project),
+                    'activity': active_entry.activity.name,
+                    'start_time': active_entry.start_time,
+                    'is_paused': active_entry.is_paused,
+                    'seconds': active_entry.get_total_seconds(),
+                }
+            week_entries = self.get_week_entries(week_start)
+            project_progress = self.get_progress(week_entries, week_start)
+            data.update({
+                'week_start': week_start.date(),
+                'active_entry': active_entry,
+                'total_assigned': self.get_hours_per_week(self.user),
+                'total_worked': sum([p['worked'] for p in project_progress]),
+                'project_progress': [{
+                    'project': p['project'].pk,
+                    'name': p['project'].name,
+                    'assigned': p['assigned'],
+                    'worked': p['worked'],
+                } for p in project_progress],
+            })
+        return HttpResponse(json.dumps(data, cls=ExportEncoder),
+                            content_type='application/json')
+
+
 @permission_required('entries.can_clock_in')
 @transaction.atomic
 def clock_in(request):
@@ -315,6 +394,86 @@ def delete_entry(request, entry_id):
     })
 
 
+EXPORT_FIELDS = (
+    'id', 'user', 'project', 'activity', 'location', 'entry_group', 'status',
+    'start_time', 'end_time', 'seconds_paused', 'pause_time', 'comments',
+    'hours', 'date_updated',
+)
+
+
+def _ndjson_response(rows):
+    return StreamingHttpResponse(
+        (json.dumps(row, cls=ExportEncoder) + '\n' for row in rows),
+        content_type='application/x-ndjson')
+
+
+def _form_errors(form):
+    return HttpResponse(json.dumps(form.errors), status=400,
+                        content_type='application/json')
+
+
+@permission_required('entries.view_entry_summary')
+def export_entries(request):
+    """
+    Streams entries as newline delimited JSON objects, ordered by id.
+
+    Pages are fetched by keyset rather than offset: when a page is full, the
+    Link header points at the next page, which starts after its last id.
+    Entries can be limited to those updated since a given time, so a sync
+    only needs to fetch what has changed.
+    """
+    form = EntryExportForm(request.GET)
+    if not form.is_valid():
+        return _form_errors(form)
+    after = form.cleaned_data['after']
+    updated_since = form.cleaned_data['updated_since']
+    limit = form.cleaned_data['limit']
+    entries = Entry.no_join.order_by('id')
+    if after is not None:
+        entries = entries.filter(id__gt=after)
+    if updated_since is not None:
+        entries = entries.filter(date_updated__gte=updated_since)
+    rows = list(entries.values(*EXPORT_FIELDS)[:limit])
+    response = _ndjson_response(rows)
+    if len(rows) == limit:
+        query = request.GET.copy()
+        query['after'] = rows[-1]['id']
+        response['Link'] = '<{0}?{1}>; rel="next"'.format(
+            request.build_absolute_uri(request.path), query.urlencode())
+    return response
+
+
+@permission_required('entries.view_entry_summary')
+def entry_changes(request):
+    """
+    Streams the entries changed since the given cursor as newline delimited
+    JSON objects, oldest change first.
+
+    The X-Next-Cursor header is the cursor for the following page. It is
+    unchanged when nothing has changed, so it can be polled; a page shorter
+    than the limit means the feed has caught up. Deleted entries do not
+    appear in the feed.
+
+    Changes appear TIMEPIECE_ENTRY_CHANGES_LAG seconds after they are made,
+    so that a transaction which commits up to that long after saving an
+    entry is not skipped by a cursor which has already passed it.
+    """
+    form = EntryChangesForm(request.GET)
+    if not form.is_valid():
+        return _form_errors(form)
+    lag = utils.get_setting('TIMEPIECE_ENTRY_CHANGES_LAG')
+    until = timezone.now() - datetime.timedelta(seconds=lag)
+    entries = Entry.no_join.changed_since(form.cleaned_data['cursor'], until)
+    rows = list(entries.values(*EXPORT_FIELDS)[:form.cleaned_data['limit']])
+    response = _ndjson_response(rows)
+    if rows:
+        response['X-Next-Cursor'] = EntryChangesForm.encode_cursor(
+            rows[-1]['date_updated'], rows[-1]['id'])
+    else:
+        response['X-Next-Cursor'] = request.GET.get('cursor', '')
+    return response
+
+
 class ScheduleMixin(object):
 
     def dispatch(self, request, *args, **kwargs):
@@ -524,6 +683,8 @@ class ScheduleAjaxView(ScheduleMixin, View):
                 ProjectHours.objects.bulk_create(
                     duplicate_builder(queryset, new_date)
                 )
+                # Bulk creation does not send post_save.
+                bump_version(DASHBOARD)
             except AttributeError:
                 for entry in duplicate_builder(queryset, new_date):
                     entry.save()
@@ -1,10 +1,15 @@
 from functools import reduce
+import heapq
+from itertools import chain, groupby
+import multiprocessing
 from optparse import make_option
 
 from dateutil.relativedelta import relativedelta
+import six
 
 from django.contrib.auth.models import User
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import BaseCommand, CommandError, OutputWrapper
+from django.db import connections
 from django.db.models import Q
 from django.utils import timezone
 
@@ -48,6 +53,11 @@ class Command(BaseCommand):
                     type='int',
                     default=0,
                     help='Show entries for the last n days only'),
+        make_option('-w', '--workers',
+                    dest='workers',
+                    type='int',
+                    default=1,
+                    help='Check users in parallel across n processes'),
     )
 
     def usage(self, subcommand):
@@ -57,12 +67,19 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         verbosity = kwargs.get('verbosity', 1)
+        workers = kwargs.get('workers', 1)
+        if workers < 1:
+            raise CommandError('The number of workers must be at least 1')
         start = self.find_start(**kwargs)
         users = self.find_users(*args)
         self.show_init(start, *args, **kwargs)
 
-        all_entries = self.find_entries(users, start, *args, **kwargs)
-        all_overlaps = self.check_all(all_entries, *args, **kwargs)
+        if workers > 1:
+            all_overlaps = self.check_all_parallel(
+                users, start, *args, **kwargs)
+        else:
+            all_entries = self.find_entries(users, start, *args, **kwargs)
+            all_overlaps = self.check_all(all_entries, *args, **kwargs)
         if verbosity >= 1:
             self.stdout.write('Total overlapping entries: %d' % all_overlaps)
 
@@ -71,34 +88,56 @@ class Command(BaseCommand):
         Go through lists of entries, find overlaps among each, return the total
         """
         all_overlaps = 0
-        while True:
-            try:
-                user_entries = all_entries.next()
-            except StopIteration:
-                return all_overlaps
-            else:
-                user_total_overlaps = self.check_entry(
-                    user_entries, *args, **kwargs)
-                all_overlaps += user_total_overlaps
+        for user_entries in all_entries:
+            user_total_overlaps = self.check_entry(
+                user_entries, *args, **kwargs)
+            all_overlaps += user_total_overlaps
+        return all_overlaps
+
+    def check_all_parallel(self, users, start, *args, **kwargs):
+        """
+        Split users into shards checked by a pool of worker processes, then
+        write each user's output in user order and return the total.
+        """
+        workers = kwargs.get('workers', 1)
+        user_ids = list(users.order_by('pk').values_list('pk', flat=True))
+        options = {
+            'all': kwargs.get('all', False),
+            'verbosity': kwargs.get('verbosity', 1),
+        }
+        shards = [(user_ids[i::workers], start, args, options)
+                  for i in range(workers)]
+        # Each worker must open its own database connection rather than
+        # share the one inherited from this process.
+        connections.close_all()
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(check_shard, shards)
+        finally:
+            pool.close()
+            pool.join()
+        all_overlaps = 0
+        for user_id, output, total in sorted(chain.from_iterable(results)):
+            if output:
+                self.stdout.write(output, ending='')
+            all_overlaps += total
+        return all_overlaps
 
     def check_entry(self, entries, *args, **kwargs):
         """
         With a list of entries, check each entry against every other
         """
         verbosity = kwargs.get('verbosity', 1)
+        entries = list(entries)
         user_total_overlaps = 0
         user = ''
-        for index_a, entry_a in enumerate(entries):
-            # Show the name the first time through
-            if index_a == 0:
-                if args and verbosity >= 1 or verbosity >= 2:
-                    self.show_name(entry_a.user)
-                    user = entry_a.user
-            for index_b in range(index_a, len(entries)):
-                entry_b = entries[index_b]
-                if entry_a.check_overlap(entry_b):
-                    user_total_overlaps += 1
-                    self.show_overlap(entry_a, entry_b, verbosity=verbosity)
+        # Show the name the first time through
+        if entries and (args and verbosity >= 1 or verbosity >= 2):
+            self.show_name(entries[0].user)
+            user = entries[0].user
+        for entry_a, entry_b in self.find_overlaps(entries):
+            user_total_overlaps += 1
+            self.show_overlap(entry_a, entry_b, verbosity=verbosity)
         if user_total_overlaps and user and verbosity >= 1:
             overlap_data = {
                 'first': user.first_name,
@@ -109,6 +148,34 @@ class Command(BaseCommand):
                               '%(first)s %(last)s: %(total)d' % overlap_data)
         return user_total_overlaps
 
+    def find_overlaps(self, entries):
+        """
+        Return the overlapping (entry_a, entry_b) pairs among a list of
+        entries, in the order a pairwise comparison of the list would.
+
+        Entries are swept in order of start time while a heap of earlier
+        entries keyed by end time is kept; an earlier entry can only overlap
+        a later one if it ends after the later one starts, so each entry is
+        compared only against the entries still open when it begins.
+        """
+        indexed = sorted(enumerate(entries), key=lambda x: x[1].start_time)
+        active = []
+        pairs = []
+        for index_b, entry_b in indexed:
+            # Open entries never overlap anything.
+            if not entry_b.end_time:
+                continue
+            while active and active[0][0] <= entry_b.start_time:
+                heapq.heappop(active)
+            for end_time, index_a, entry_a in active:
+                # Compare in list order, as check_overlap is not symmetric
+                # for entries sharing a start time.
+                first, second = sorted((index_a, index_b))
+                if entries[first].check_overlap(entries[second]):
+                    pairs.append((first, second))
+            heapq.heappush(active, (entry_b.end_time, index_b, entry_b))
+        return [(entries[a], entries[b]) for a, b in sorted(pairs)]
+
     def find_start(self, **kwargs):
         """
         Determine the starting point of the query using CLI keyword arguments
@@ -158,16 +225,18 @@ class Command(BaseCommand):
         """
         Find all entries for all users, from a given starting point.
         If no starting point is provided, all entries are returned.
+
+        Entries for every user are streamed from a single query ordered by
+        user and start time, and yielded as one list per user.
         """
         forever = kwargs.get('all', False)
-        for user in users:
-            if forever:
-                entries = Entry.objects.filter(user=user).order_by('start_time')
-            else:
-                entries = Entry.objects.filter(
-                    user=user, start_time__gte=start).order_by(
-                    'start_time')
-            yield entries
+        entries = Entry.objects.filter(user__in=users)
+        if not forever:
+            entries = entries.filter(start_time__gte=start)
+        entries = entries.select_related('user', 'project__business')
+        entries = entries.order_by('user_id', 'start_time', 'pk')
+        for user_id, user_entries in groupby(entries.iterator(), lambda e: e.user_id):
+            yield list(user_entries)
 
     # output methods
     def show_init(self, start, *args, **kwargs):
@@ -208,3 +277,25 @@ class Command(BaseCommand):
                       'with another entry.' % data_a)
         if kwargs.get('verbosity', 1):
             self.stdout.write(output)
+
+
+def check_shard(shard):
+    """
+    Check one shard of users for overlaps in a worker process.
+
+    Returns a list of (user_id, output, total overlaps) for each user that
+    has entries.
+    """
+    user_ids, start, args, options = shard
+    results = []
+    try:
+        command = Command()
+        users = User.objects.filter(pk__in=user_ids)
+        for user_entries in command.find_entries(users, start, *args, **options):
+            out = six.StringIO()
+            command.stdout = OutputWrapper(out)
+            total = command.check_entry(user_entries, *args, **options)
+            results.append((user_entries[0].user_id, out.getvalue(), total))
+    finally:
+        connections.close_all()
+    return results
@@ -0,0 +1,61 @@
+import io
+from optparse import make_option
+
+import six
+
+from django.core.management.base import BaseCommand, CommandError
+
+from timepiece.entries.importers import EntryImporter, read_csv, read_ndjson
+
+
+class Command(BaseCommand):
+    """
+    Management command to import entries from a CSV or NDJSON file.
+    Use ./manage.py import_entries --help for more details
+    """
+    args = '<file>'
+    help = ("Import entries from a CSV or newline delimited JSON file, with\n"
+            "the fields of the entry export. Rows which are not valid are\n"
+            "reported and skipped. Use --help for options.")
+
+    option_list = BaseCommand.option_list + (
+        make_option('--format',
+                    dest='format',
+                    default=None,
+                    choices=('csv', 'ndjson'),
+                    help='The format of the file, csv or ndjson. Defaults to '
+                         'ndjson for .ndjson and .jsonl files, otherwise csv'),
+        make_option('--chunk-size',
+                    dest='chunk_size',
+                    type='int',
+                    default=1000,
+                    help='The number of rows validated and created at once'),
+    )
+
+    def handle(self, *args, **kwargs):
+        verbosity = kwargs.get('verbosity', 1)
+        if len(args) != 1:
+            raise CommandError('Give the file to import')
+        path = args[0]
+        export_format = kwargs.get('format')
+        if export_format is None:
+            is_ndjson = path.endswith(('.ndjson', '.jsonl'))
+            export_format = 'ndjson' if is_ndjson else 'csv'
+        read = read_ndjson if export_format == 'ndjson' else read_csv
+
+        importer = EntryImporter(chunk_size=kwargs.get('chunk_size') or 1000)
+        try:
+            if six.PY2:
+                lines = open(path, 'rb')
+            else:
+                lines = io.open(path, newline='', encoding='utf-8')
+        except IOError as e:
+            raise CommandError(str(e))
+        with lines:
+            importer.run(read(lines))
+
+        for number, messages in importer.errors:
+            self.stderr.write('Line {0}: {1}'.format(number, ' '.join(messages)))
+        if verbosity >= 1:
+            self.stdout.write('Imported {0} entries, skipped {1} rows'.format(
+                importer.created, len(importer.errors)))
@@ -0,0 +1,62 @@
+import datetime
+from optparse import make_option
+
+from dateutil.relativedelta import relativedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from timepiece.entries.models import EntryRollup, EntryRollupCoverage
+
+
+class Command(BaseCommand):
+    """
+    Management command to rebuild the daily rollups of entry hours.
+    Use ./manage.py rebuild_rollups --help for more details
+    """
+    help = ("Rebuild the daily rollups of entry hours which the reports read.\n"
+            "Use --help for options.")
+
+    option_list = BaseCommand.option_list + (
+        make_option('--from',
+                    dest='from',
+                    default=None,
+                    help='Rebuild from this date (YYYY-MM-DD) only'),
+        make_option('--to',
+                    dest='to',
+                    default=None,
+                    help='Rebuild up to and including this date (YYYY-MM-DD) only'),
+    )
+
+    def handle(self, *args, **kwargs):
+        verbosity = kwargs.get('verbosity', 1)
+        start = self.parse_date(kwargs.get('from'))
+        end = self.parse_date(kwargs.get('to'))
+        if end is not None:
+            end += relativedelta(days=1)
+        if start is not None and end is not None and start >= end:
+            raise CommandError('--from must not be after --to')
+        EntryRollup.objects.rebuild(start=start, end=end)
+        EntryRollupCoverage.objects.create(start=start, end=end)
+        if verbosity >= 1:
+            self.stdout.write('Rebuilt %d rollups' % self.count(start, end))
+
+    def parse_date(self, value):
+        if not value:
+            return None
+        try:
+            date = datetime.datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise CommandError('%s is not a date of the form YYYY-MM-DD' % value)
+        if settings.USE_TZ:
+            date = timezone.make_aware(date, timezone.get_current_timezone())
+        return date
+
+    def count(self, start, end):
+        rollups = EntryRollup.objects.all()
+        if start is not None:
+            rollups = rollups.filter(day__gte=start)
+        if end is not None:
+            rollups = rollups.filter(day__lt=end)
+        return rollups.count()
@@ -0,0 +1,89 @@
+import datetime
+from dateutil.relativedelta import relativedelta
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from timepiece.tests.base import ViewTestMixin
+from timepiece.tests import factories
+
+from timepiece.contracts.models import ProjectContract
+
+
+class TestEstimationAccuracyReport(ViewTestMixin, TestCase):
+    url_name = 'report_estimation_accuracy'
+
+    def setUp(self):
+        super(TestEstimationAccuracyReport, self).setUp()
+        self.user = factories.Superuser()
+        self.login_user(self.user)
+
+    def create_contract(self, end_date, contracted, worked, **kwargs):
+        kwargs.setdefault('status', ProjectContract.STATUS_COMPLETE)
+        kwargs.setdefault('type', ProjectContract.PROJECT_FIXED)
+        project = factories.Project()
+        contract = factories.ProjectContract(
+            start_date=end_date - relativedelta(months=1), end_date=end_date,
+            contract_hours=contracted, projects=[project], **kwargs)
+        start = datetime.datetime.combine(end_date, datetime.time(9))
+        factories.Entry(
+            project=project, activity=factories.BillableActivityFactory(),
+            start_time=start, end_time=start + relativedelta(hours=worked))
+        return contract
+
+    def get_data(self, data=None):
+        response = self._get(data=data)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.context['data']), response.context['chart_max']
+
+    def test_no_permission(self):
+        self.login_user(factories.User())
+        response = self._get()
+        self.assertEqual(response.status_code, 302)
+
+    def test_no_contracts(self):
+        data, chart_max = self.get_data()
+        self.assertEqual(len(data), 1)
+        self.assertEqual(chart_max, 0)
+
+    def test_contracts(self):
+        """Only complete fixed-price contracts are plotted."""
+        first = self.create_contract(datetime.date(2012, 3, 1), 10, 4)
+        second = self.create_contract(datetime.date(2012, 6, 1), 6, 8)
+        self.create_contract(
+            datetime.date(2012, 6, 1), 20, 20, status=ProjectContract.STATUS_CURRENT)
+        self.create_contract(
+            datetime.date(2012, 6, 1), 20, 20,
+            type=ProjectContract.PROJECT_PRE_PAID_HOURLY)
+        data, chart_max = self.get_data()
+        self.assertEqual(sorted(data[1:]), [
+            [6, 8, '{0} (133.33%)'.format(second.name)],
+            [10, 4, '{0} (40.00%)'.format(first.name)],
+        ])
+        self.assertEqual(chart_max, 10)
+
+    def test_date_window(self):
+        """Contracts can be limited to those which ended within a window."""
+        self.create_contract(datetime.date(2012, 3, 1), 10, 4)
+        second = self.create_contract(datetime.date(2012, 6, 1), 6, 8)
+        self.create_contract(datetime.date(2012, 9, 1), 6, 8)
+        data, chart_max = self.get_data({
+            'from_date': '2012-05-01',
+            'to_date': '2012-06-01',
+        })
+        self.assertEqual(data[1:], [[6, 8, '{0} (133.33%)'.format(second.name)]])
+        self.assertEqual(chart_max, 8)
+
+    def test_query_count(self):
+        """The number of queries does not grow with the number of contracts."""
+        self.create_contract(datetime.date(2012, 3, 1), 10, 4)
+        with CaptureQueriesContext(connection) as one:
+            self._get()
+        for i in range(3):
+            self.create_contract(datetime.date(2012, 3, 1), 10, 4)
+        with CaptureQueriesContext(connection) as many:
+            data, chart_max = self.get_data()
+        self.assertEqual(len(data), 5)
+        self.assertLessEqual(len(many), len(one))
@@ -1,5 +1,7 @@
 import datetime
+from dateutil.relativedelta import relativedelta
 from decimal import Decimal
+import json
 from random import randint
 
 from django.contrib.auth.models import Permission
@@ -132,6 +134,25 @@ class TestHourlyReport(ViewTestMixin, LogTimeMixin, ReportsTestBase):
         self.assertEqual(pj_totals[0][1], [24])
         self.assertEqual(pj_totals[1], [72])
 
+    def test_project_totals_cells(self):
+        """Hours are summed per cell and dates without a header are ignored."""
+        day = datetime.datetime(2011, 1, 3)
+        row = {'project': 1, 'project__name': 'Project'}
+        entries = [
+            dict(row, date=day - relativedelta(days=1), billable=True, hours=Decimal(8)),
+            dict(row, date=day, billable=True, hours=Decimal(1)),
+            dict(row, date=day, billable=False, hours=Decimal(2)),
+            dict(row, date=day, billable=True, hours=Decimal(3)),
+            dict(row, date=day + relativedelta(days=1), billable=False, hours=Decimal(4)),
+        ]
+        date_headers = generate_dates(day, day + relativedelta(days=2), 'day')
+        rows, totals = list(get_project_totals(entries, date_headers, by='project'))[0]
+        self.assertEqual(rows[0][:2], ('Project', 1))
+        self.assertEqual(
+            [(d['billable'], d['nonbillable'], d['total']) for d in rows[0][2]],
+            [(4, 2, 6), (0, 4, 4), (0, 0, 0)])
+        self.assertEqual(totals, [6, 4, ''])
+
     def test_monthly_total(self):
         start = utils.add_timezone(datetime.datetime(2011, 1, 1))
         end = utils.add_timezone(datetime.datetime(2011, 3, 1))
@@ -292,6 +313,21 @@ class TestHourlyReport(ViewTestMixin, LogTimeMixin, ReportsTestBase):
         self.bulk_entries()
         self.check_totals(args, data)
 
+    def test_export_ndjson(self):
+        """The user summary can be exported as typed NDJSON."""
+        args = self.args_helper(
+            billable=True, non_billable=False, paid_leave=False, trunc='day',
+            export='By User', format='ndjson')
+        self.bulk_entries()
+        self.login_user(self.superuser)
+        response = self._get(data=args)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['Name'] for row in rows[-1:]], ['Totals'])
+        self.assertEqual(rows[-1]['01/02/2011'], 9)
+        self.assertEqual(rows[-1]['Total'], 27)
+
     def test_form_week(self):
         """Hours should be totaled for each week in the date range."""
         args = {
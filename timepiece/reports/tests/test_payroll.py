@@ -11,7 +11,7 @@ from timepiece.tests import factories
 from timepiece.tests.base import ViewTestMixin, LogTimeMixin
 
 from timepiece.entries.models import Entry
-from timepiece.reports.utils import find_overtime
+from timepiece.reports.utils import find_overtime, get_payroll_totals
 
 
 class PayrollTest(ViewTestMixin, LogTimeMixin, TestCase):
@@ -279,6 +279,20 @@ class PayrollTest(ViewTestMixin, LogTimeMixin, TestCase):
 
         self.assertEquals(totals['grand_total'], Decimal('230.00'))
 
+    def testMonthlyPayrollQueries(self):
+        """Work and leave are each fetched once, however many users."""
+        for user in (self.user, self.user2, factories.User()):
+            self.make_logs(self.middle, user)
+        leave_ids = settings.TIMEPIECE_PAID_LEAVE_PROJECTS.values()
+        work = Entry.objects.date_trunc('month', ('project__type__label',))
+        work = work.exclude(project__in=leave_ids)
+        leave = Entry.objects.filter(project__in=leave_ids)
+        leave = leave.values('user', 'hours', 'project__name')
+        with self.assertNumQueries(2):
+            labels, rows = get_payroll_totals(work, leave)
+        self.assertEqual(len(rows), 3 + 1)
+        self.assertEqual(rows[-1]['leave'][-1]['hours'], Decimal('36.00'))
+
     def testNoPermission(self):
         """
         Regular users shouldn't be able to retrieve the payroll report
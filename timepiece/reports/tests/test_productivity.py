@@ -4,7 +4,9 @@ from dateutil.relativedelta import relativedelta
 import json
 
 from django.contrib.auth.models import Permission
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from timepiece.tests.base import ViewTestMixin
 from timepiece.tests import factories
@@ -185,6 +187,23 @@ class TestProductivityReport(ViewTestMixin, TestCase):
         self._check_row(report[2], ['User 2', 4.0, 4.0])
         self._check_row(report[3], ['User 3', 4.0, 0.0])
 
+    def test_query_count(self):
+        """The number of queries does not grow with the project's length."""
+        data = {'project_1': self.project.pk, 'organize_by': 'week'}
+        with CaptureQueriesContext(connection) as short:
+            self._get(data=data)
+        start_time = self.weeks[3] + relativedelta(weeks=104)
+        factories.Entry(user=self.users[0], project=self.project,
+                        start_time=start_time,
+                        end_time=start_time + relativedelta(hours=2))
+        with CaptureQueriesContext(connection) as long:
+            response = self._get(data=data)
+        self.assertEqual(len(long), len(short))
+        form, report, organize_by, worked, assigned = self._unpack(response)
+        self.assertEqual(len(report), 1 + 4 + 104)  # Include header row
+        self._check_row(report[5], [u'Oct 22, 2012', 0.0, 0.0])
+        self._check_row(report[-1], [u'Oct 13, 2014', 2.0, 0.0])
+
     def test_export(self):
         """Data should be exported in CSV format."""
         data = {'project_1': self.project.pk, 'organize_by': 'week',
@@ -196,7 +215,7 @@ class TestProductivityReport(ViewTestMixin, TestCase):
         disposition = 'attachment; filename={0}_productivity.csv'.format(
             self.project.name)
         self.assertTrue(data['Content-Disposition'].startswith(disposition))
-        report = response.content.decode('utf-8').splitlines()
+        report = b''.join(response.streaming_content).decode('utf-8').splitlines()
         self.assertEqual(len(report), 1 + 4)  # Include header row
 
         def parse_csv_row(s):
@@ -5,32 +5,10 @@ from decimal import Decimal
 from itertools import groupby
 
 from timepiece.utils import (
-    get_hours_summary, add_timezone, get_week_start, get_month_start,
+    add_timezone, get_week_start, get_month_start,
     get_year_start)
 
 
-def date_totals(entries, by):
-    """Yield a user's name and a dictionary of their hours"""
-    date_dict = {}
-    for date, date_entries in groupby(entries, lambda x: x['date']):
-        if isinstance(date, datetime.datetime):
-            date = date.date()
-        d_entries = list(date_entries)
-
-        if by == 'user':
-            name = ' '.join((d_entries[0]['user__first_name'],
-                             d_entries[0]['user__last_name']))
-        elif by == 'project':
-            name = d_entries[0]['project__name']
-        else:
-            name = d_entries[0][by]
-
-        pk = d_entries[0][by]
-        hours = get_hours_summary(d_entries)
-        date_dict[date] = hours
-    return name, pk, date_dict
-
-
 def find_overtime(dates):
     """Given a list of weekly summaries, return the overtime for each week"""
     return sum([day - 40 for day in dates if day > 40])
@@ -58,35 +36,61 @@ def get_project_totals(entries, date_headers, hour_type=None, overtime=False,
                        total_column=False, by='user'):
     """
     Yield hour totals grouped by user and date. Optionally including overtime.
+
+    The date headers are indexed once, so each entry is added straight to its
+    cell in a single pass over the entries.
     """
-    totals = [0 for date in date_headers]
+    days = [day.date() if isinstance(day, datetime.datetime) else day
+            for day in date_headers]
+    columns = dict((day, index) for index, day in enumerate(days))
+    totals = [0 for day in days]
     rows = []
     for thing, thing_entries in groupby(entries, lambda x: x[by]):
-        name, thing_id, date_dict = date_totals(thing_entries, by)
-        dates = []
-        for index, day in enumerate(date_headers):
-            if isinstance(day, datetime.datetime):
-                day = day.date()
-            if hour_type:
-                total = date_dict.get(day, {}).get(hour_type, 0)
-                dates.append(total)
+        billable = [0 for day in days]
+        non_billable = [0 for day in days]
+        for entry in thing_entries:
+            date = entry['date']
+            if isinstance(date, datetime.datetime):
+                date = date.date()
+            index = columns.get(date)
+            if index is None:
+                continue
+            if entry['billable']:
+                billable[index] += entry['hours']
             else:
-                billable = date_dict.get(day, {}).get('billable', 0)
-                nonbillable = date_dict.get(day, {}).get('non_billable', 0)
-                total = billable + nonbillable
-                dates.append({
-                    'day': day,
-                    'billable': billable,
-                    'nonbillable': nonbillable,
-                    'total': total
-                })
-            totals[index] += total
+                non_billable[index] += entry['hours']
+
+        if by == 'user':
+            name = ' '.join((entry['user__first_name'], entry['user__last_name']))
+        elif by == 'project':
+            name = entry['project__name']
+        else:
+            name = entry[by]
+
+        if hour_type == 'billable':
+            dates = billable
+        elif hour_type == 'non_billable':
+            dates = non_billable
+        else:
+            dates = [b + n for b, n in zip(billable, non_billable)]
+        if not hour_type:
+            dates = [{
+                'day': day,
+                'billable': billable[index],
+                'nonbillable': non_billable[index],
+                'total': total,
+            } for index, (day, total) in enumerate(zip(days, dates))]
+            for index, cell in enumerate(dates):
+                totals[index] += cell['total']
+        else:
+            for index, total in enumerate(dates):
+                totals[index] += total
         if total_column:
             dates.append(sum(dates))
         if overtime:
             dates.append(find_overtime(dates))
         dates = [date or '' for date in dates]
-        rows.append((name, thing_id, dates))
+        rows.append((name, thing, dates))
     if total_column:
         totals.append(sum(totals))
     totals = [t or '' for t in totals]
@@ -121,23 +125,16 @@ def get_payroll_totals(month_work_entries, month_leave_entries):
 
     def _get_index(status, label):
         """
-        Returns the index in row[status] (where row is the row corresponding
-        to the current user) where hours for the project label should be
-        recorded.
+        Returns the index in row[status] where hours for the project label
+        should be recorded, adding the label if it does not exist yet.
 
-        If the label does not exist, then it is added to the labels list.
-        Each row and the totals row is updated accordingly.
-
-        Requires that labels, rows, and totals are in scope.
+        Requires that labels and indexes are in scope.
         """
-        if label in labels[status]:
-            return labels[status].index(label)
-        # Otherwise: update labels, rows, and totals to reflect the addition.
-        labels[status].append(label)
-        for row in rows:
-            row[status].insert(-1, {'hours': Decimal(), 'percent': Decimal()})
-        totals[status].insert(-1, {'hours': Decimal(), 'percent': Decimal()})
-        return len(labels[status]) - 1
+        index = indexes[status].get(label)
+        if index is None:
+            index = indexes[status][label] = len(labels[status])
+            labels[status].append(label)
+        return index
 
     def _construct_row(name, user_id=None):
         """Constructs an empty row for the given name."""
@@ -164,34 +161,40 @@ def get_payroll_totals(month_work_entries, month_leave_entries):
 
     work_statuses = ('billable', 'nonbillable')
     leave_statuses = ('leave', )
-    labels = dict([(status, []) for status in work_statuses + leave_statuses])
-    rows = []
-    totals = _construct_row('Totals')
-    for user, work_entries in groupby(month_work_entries, lambda e: e['user']):
+    statuses = work_statuses + leave_statuses
+    labels = dict([(status, []) for status in statuses])
+    indexes = dict([(status, {}) for status in statuses])
+
+    leave_by_user = {}
+    for entry in month_leave_entries:
+        leave_by_user.setdefault(entry['user'], []).append(entry)
 
+    # Sum each user's hours by label first, so that the rows can be built
+    # once every label is known.
+    user_hours = []
+    for user, work_entries in groupby(month_work_entries, lambda e: e['user']):
         work_entries = list(work_entries)
-        row = _construct_row(**_get_user_info(work_entries))
-        rows.append(row)
+        hours = dict([(status, {}) for status in statuses])
         for entry in work_entries:
             status = 'billable' if entry['billable'] else 'nonbillable'
-            label = entry['project__type__label']
-            index = _get_index(status, label)
-            hours = entry['hours']
-            row[status][index]['hours'] += hours
-            row[status][-1]['hours'] += hours
-            totals[status][index]['hours'] += hours
-            totals[status][-1]['hours'] += hours
-
-        leave_entries = month_leave_entries.filter(user=user)
-        status = 'leave'
-        for entry in leave_entries:
-            label = entry.get('project__name')
-            index = _get_index(status, label)
-            hours = entry.get('hours')
-            row[status][index]['hours'] += hours
-            row[status][-1]['hours'] += hours
-            totals[status][index]['hours'] += hours
-            totals[status][-1]['hours'] += hours
+            index = _get_index(status, entry['project__type__label'])
+            hours[status][index] = hours[status].get(index, 0) + entry['hours']
+        for entry in leave_by_user.get(user, []):
+            index = _get_index('leave', entry.get('project__name'))
+            hours['leave'][index] = hours['leave'].get(index, 0) + entry.get('hours')
+        user_hours.append((_get_user_info(work_entries), hours))
+
+    rows = []
+    totals = _construct_row('Totals')
+    for user_info, hours in user_hours:
+        row = _construct_row(**user_info)
+        rows.append(row)
+        for status in statuses:
+            for index, label_hours in hours[status].items():
+                row[status][index]['hours'] += label_hours
+                row[status][-1]['hours'] += label_hours
+                totals[status][index]['hours'] += label_hours
+                totals[status][-1]['hours'] += label_hours
 
         row['work_total'] = _get_sum(row, work_statuses)
         _add_percentages(row, work_statuses, row['work_total'])
@@ -1,4 +1,3 @@
-import csv
 import json
 
 from collections import OrderedDict
@@ -6,8 +5,7 @@ from dateutil.relativedelta import relativedelta
 from itertools import groupby
 
 from django.contrib.auth.decorators import permission_required
-from django.db.models import Sum, Q, Min, Max
-from django.http import HttpResponse
+from django.db.models import Sum, Q
 from django.shortcuts import render
 from django.template.defaultfilters import date as date_format_filter
 from django.utils import timezone
@@ -15,10 +13,13 @@ from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 
 from timepiece import utils
-from timepiece.utils.csv import CSVViewMixin, DecimalEncoder
+from timepiece.forms import DateForm
+from timepiece.utils.csv import DecimalEncoder
+from timepiece.utils.export import ExportViewMixin, stream_export
+from timepiece.utils.expressions import DateTrunc
 
 from timepiece.contracts.models import ProjectContract
-from timepiece.entries.models import Entry, ProjectHours
+from timepiece.entries.models import Entry, EntryRollup, ProjectHours
 from timepiece.reports.forms import (
     BillableHoursReportForm, HourlyReportForm, ProductivityReportForm,
     PayrollSummaryReportForm)
@@ -41,9 +42,17 @@ class ReportMixin(object):
         if form.is_valid():
             data = form.cleaned_data
             start, end = form.save()
-            entryQ = self.get_entry_query(start, end, data)
+            # Read the daily rollups rather than every entry when they have
+            # been rebuilt for the whole period.
+            rollups = EntryRollup.objects.covers(start, end)
+            entryQ = self.get_entry_query(start, end, data, rollups)
             trunc = data['trunc']
-            if entryQ:
+            if entryQ and rollups:
+                vals = ('activity', 'project', 'project__name',
+                        'project__status', 'project__type__label')
+                entries = EntryRollup.objects.date_trunc(
+                    trunc, extra_values=vals).filter(entryQ)
+            elif entryQ:
                 vals = ('pk', 'activity', 'project', 'project__name',
                         'project__status', 'project__type__label')
                 entries = Entry.objects.date_trunc(
@@ -73,8 +82,8 @@ class ReportMixin(object):
 
         return context
 
-    def get_entry_query(self, start, end, data):
-        """Builds Entry query from form data."""
+    def get_entry_query(self, start, end, data, rollups=False):
+        """Builds Entry (or EntryRollup, if rollups) query from form data."""
         # Entry types.
         incl_billable = data.get('billable', True)
         incl_nonbillable = data.get('non_billable', True)
@@ -85,7 +94,10 @@ class ReportMixin(object):
             return None
 
         # All entries must meet time period requirements.
-        basicQ = Q(end_time__gte=start, end_time__lt=end)
+        if rollups:
+            basicQ = Q(day__gte=start, day__lt=end)
+        else:
+            basicQ = Q(end_time__gte=start, end_time__lt=end)
 
         # Filter by project for HourlyReport.
         projects = data.get('projects', None)
@@ -149,18 +161,17 @@ class ReportMixin(object):
         return start, end
 
 
-class HourlyReport(ReportMixin, CSVViewMixin, TemplateView):
+class HourlyReport(ReportMixin, ExportViewMixin, TemplateView):
     template_name = 'timepiece/reports/hourly.html'
 
     def convert_context_to_csv(self, context):
-        """Convert the context dictionary into a CSV file."""
-        content = []
+        """Convert the context dictionary into CSV rows."""
         date_headers = context['date_headers']
 
         headers = ['Name']
         headers.extend([date.strftime('%m/%d/%Y') for date in date_headers])
         headers.append('Total')
-        content.append(headers)
+        yield headers
 
         summaries = context['summaries']
 
@@ -170,11 +181,10 @@ class HourlyReport(ReportMixin, CSVViewMixin, TemplateView):
             for name, user_id, hours in rows:
                 data = [name]
                 data.extend(hours)
-                content.append(data)
+                yield data
             total = ['Totals']
             total.extend(totals)
-            content.append(total)
-        return content
+            yield total
 
     @property
     def defaults(self):
@@ -194,7 +204,7 @@ class HourlyReport(ReportMixin, CSVViewMixin, TemplateView):
     def get(self, request, *args, **kwargs):
         self.export = request.GET.get('export', False)
         context = self.get_context_data()
-        kls = CSVViewMixin if self.export else TemplateView
+        kls = ExportViewMixin if self.export else TemplateView
         return kls.render_to_response(self, context)
 
     def get_context_data(self, **kwargs):
@@ -246,7 +256,7 @@ class HourlyReport(ReportMixin, CSVViewMixin, TemplateView):
         request = self.request.GET.copy()
         from_date = request.get('from_date')
         to_date = request.get('to_date')
-        return 'hours_{0}_to_{1}_by_{2}.csv'.format(
+        return 'hours_{0}_to_{1}_by_{2}'.format(
             from_date, to_date, context.get('trunc', ''))
 
     def get_form(self):
@@ -393,67 +403,61 @@ def report_productivity(request):
         organize_by = form.cleaned_data['organize_by']
         export = request.GET.get('export', False)
 
-        actualsQ = Q(project=project, end_time__isnull=False)
-        actuals = Entry.objects.filter(actualsQ)
+        actuals = Entry.no_join.filter(project=project, end_time__isnull=False)
         projections = ProjectHours.objects.filter(project=project)
-        entry_count = actuals.count() + projections.count()
-
-        if organize_by == 'week' and entry_count > 0:
-            # Determine the project's time range.
-            amin, amax, pmin, pmax = (None, None, None, None)
-            if actuals.count() > 0:
-                amin = list(actuals.aggregate(Min('start_time')).values())[0]
-                amin = utils.get_week_start(amin).date()
-                amax = list(actuals.aggregate(Max('start_time')).values())[0]
-                amax = utils.get_week_start(amax).date()
-            if projections.count() > 0:
-                pmin = list(projections.aggregate(Min('week_start')).values())[0]
-                pmax = list(projections.aggregate(Max('week_start')).values())[0]
-            current = min(amin, pmin) if (amin and pmin) else (amin or pmin)
-            latest = max(amax, pmax) if (amax and pmax) else (amax or pmax)
-
-            # Report for each week during the project's time range.
-            while current <= latest:
-                next_week = current + relativedelta(days=7)
-                actual_hours = actuals.filter(start_time__gte=current, start_time__lt=next_week)
-                actual_hours = list(actual_hours.aggregate(Sum('hours')).values())[0]
-                projected_hours = projections.filter(
-                    week_start__gte=current, week_start__lt=next_week)
-                projected_hours = list(projected_hours.aggregate(Sum('hours')).values())[0]
-                report.append([date_format_filter(current, 'M j, Y'),
-                              actual_hours or 0, projected_hours or 0])
-                current = next_week
-
-        elif organize_by == 'user' and entry_count > 0:
-            # Determine all users who worked on or were assigned to the
-            # project.
+
+        if organize_by == 'week':
+            # Sum the hours of each week with a single query per model.
+            actuals = actuals.annotate(week=DateTrunc('week', 'start_time'))
+            actuals = actuals.values('week').annotate(hours=Sum('hours'))
+            actual_hours = dict(
+                (utils.get_week_start(row['week']).date(), row['hours'])
+                for row in actuals.order_by())
+            projections = projections.values('week_start')
+            projections = projections.annotate(hours=Sum('hours'))
+            projected_hours = {}
+            for row in projections.order_by():
+                week = utils.get_week_start(row['week_start']).date()
+                projected_hours[week] = projected_hours.get(week, 0) + row['hours']
+
+            # Report for each week during the project's time range, including
+            # the weeks without any hours.
+            weeks = set(actual_hours) | set(projected_hours)
+            if weeks:
+                current, latest = min(weeks), max(weeks)
+                while current <= latest:
+                    report.append([date_format_filter(current, 'M j, Y'),
+                                  actual_hours.get(current) or 0,
+                                  projected_hours.get(current) or 0])
+                    current += relativedelta(days=7)
+
+        elif organize_by == 'user':
+            # Sum the hours of everyone who worked on or was assigned to the
+            # project with a single query per model.
             vals = ('user', 'user__first_name', 'user__last_name')
-            ausers = list(actuals.values_list(*vals).distinct())
-            pusers = list(projections.values_list(*vals).distinct())
+            actuals = actuals.values(*vals).annotate(hours=Sum('hours'))
+            actual_hours = dict(
+                (tuple(row[v] for v in vals), row['hours'])
+                for row in actuals.order_by())
+            projections = projections.values(*vals).annotate(hours=Sum('hours'))
+            projected_hours = dict(
+                (tuple(row[v] for v in vals), row['hours'])
+                for row in projections.order_by())
             key = lambda x: (x[1] + x[2]).lower()  # Sort by name
-            users = sorted(list(set(ausers + pusers)), key=key)
+            users = sorted(set(actual_hours) | set(projected_hours), key=key)
 
             # Report for each user.
             for user in users:
                 name = '{0} {1}'.format(user[1], user[2])
-                actual_hours = actuals.filter(user=user[0])
-                actual_hours = list(actual_hours.aggregate(Sum('hours')).values())[0]
-                projected_hours = projections.filter(user=user[0])
-                projected_hours = list(projected_hours.aggregate(Sum('hours')).values())[0]
-                report.append([name, actual_hours or 0, projected_hours or 0])
+                report.append([name, actual_hours.get(user) or 0,
+                               projected_hours.get(user) or 0])
 
         col_headers = [organize_by.title(), 'Worked Hours', 'Assigned Hours']
         report.insert(0, col_headers)
 
         if export:
-            response = HttpResponse(content_type='text/csv')
-            filename = '{0}_productivity'.format(project.name)
-            content_disp = 'attachment; filename={0}.csv'.format(filename)
-            response['Content-Disposition'] = content_disp
-            writer = csv.writer(response)
-            for row in report:
-                writer.writerow(row)
-            return response
+            return stream_export(report, '{0}_productivity'.format(project.name),
+                                 request.GET.get('format', 'csv'))
 
     return render(request, 'timepiece/reports/productivity.html', {
         'form': form,
@@ -468,20 +472,31 @@ def report_productivity(request):
 def report_estimation_accuracy(request):
     """
     Idea from Software Estimation, Demystifying the Black Art, McConnel 2006 Fig 3-3.
+
+    Contracts can be limited to those which ended within a date window.
     """
+    form = DateForm(request.GET or None)
     contracts = ProjectContract.objects.filter(
         status=ProjectContract.STATUS_COMPLETE,
         type=ProjectContract.PROJECT_FIXED
     )
+    if form.is_valid():
+        from_date, to_date = form.save()
+        if from_date:
+            contracts = contracts.filter(end_date__gte=from_date)
+        if to_date:
+            contracts = contracts.filter(end_date__lt=to_date)
     data = [('Target (hrs)', 'Actual (hrs)', 'Point Label')]
-    for c in contracts:
-        if c.contracted_hours() == 0:
+    chart_max = 0  # max of all targets & actuals
+    for c in contracts.with_hours():
+        contracted, worked = c.contracted_hours(), c.hours_worked
+        if contracted == 0:
             continue
-        pt_label = "%s (%.2f%%)" % (c.name,
-                                    c.hours_worked / c.contracted_hours() * 100)
-        data.append((c.contracted_hours(), c.hours_worked, pt_label))
-        chart_max = max([max(x[0], x[1]) for x in data[1:]])  # max of all targets & actuals
+        pt_label = "%s (%.2f%%)" % (c.name, worked / contracted * 100)
+        data.append((contracted, worked, pt_label))
+        chart_max = max(chart_max, contracted, worked)
     return render(request, 'timepiece/reports/estimation_accuracy.html', {
+        'form': form,
         'data': json.dumps(data, cls=DecimalEncoder),
         'chart_max': chart_max,
     })
@@ -0,0 +1,95 @@
+from dateutil.relativedelta import relativedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.utils import timezone
+
+from timepiece.context_processors import quick_clock_in, quick_search
+
+from . import factories
+
+
+class QuickClockInTestCase(TestCase):
+
+    def setUp(self):
+        super(QuickClockInTestCase, self).setUp()
+        cache.clear()
+        self.user = factories.User()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+        self.now = timezone.now()
+
+    def tearDown(self):
+        cache.clear()
+        super(QuickClockInTestCase, self).tearDown()
+
+    def create_project(self):
+        return factories.Project(
+            type__enable_timetracking=True, status__enable_timetracking=True)
+
+    def clock_in(self, project, hours_ago):
+        start = self.now - relativedelta(hours=hours_ago)
+        return factories.Entry(
+            user=self.user, project=project, start_time=start,
+            end_time=start + relativedelta(minutes=30))
+
+    def test_recent_projects(self):
+        """The 10 most recently used trackable projects are displayed."""
+        projects = [self.create_project() for i in range(12)]
+        for hours_ago, project in enumerate(projects):
+            self.clock_in(project, hours_ago)
+            self.clock_in(project, hours_ago + 20)
+        untrackable = factories.Project()
+        self.clock_in(untrackable, 0)
+        context = quick_clock_in(self.request)
+        self.assertEqual(context['work_projects'], projects[:10])
+
+    def test_cached(self):
+        """Subsequent calls for the user do not query the database."""
+        project = self.create_project()
+        self.clock_in(project, 1)
+        list(quick_clock_in(self.request)['work_projects'])
+        with self.assertNumQueries(0):
+            work_projects = list(quick_clock_in(self.request)['work_projects'])
+        self.assertEqual(work_projects, [project])
+
+    def test_lazy(self):
+        """Nothing is queried until the projects are used."""
+        project = self.create_project()
+        self.clock_in(project, 1)
+        leave = {'sick': self.create_project().pk}
+        with self.settings(TIMEPIECE_PAID_LEAVE_PROJECTS=leave):
+            with self.assertNumQueries(0):
+                context = quick_clock_in(self.request)
+            with self.assertNumQueries(2):
+                self.assertEqual(list(context['work_projects']), [project])
+                self.assertEqual(list(context['leave_projects']), [])
+
+    def test_invalidated_on_clock_in(self):
+        """A new entry moves its project to the top of the list."""
+        first, second = self.create_project(), self.create_project()
+        self.clock_in(first, 2)
+        self.clock_in(second, 3)
+        self.assertEqual(quick_clock_in(self.request)['work_projects'], [first, second])
+        self.clock_in(second, 1)
+        self.assertEqual(quick_clock_in(self.request)['work_projects'], [second, first])
+
+    def test_invalidated_on_trackable_change(self):
+        """Projects which can no longer be clocked in to are removed."""
+        project = self.create_project()
+        self.clock_in(project, 1)
+        self.assertEqual(quick_clock_in(self.request)['work_projects'], [project])
+        project.status.enable_timetracking = False
+        project.status.save()
+        self.assertEqual(quick_clock_in(self.request)['work_projects'], [])
+
+
+class QuickSearchTestCase(TestCase):
+
+    def test_lazy(self):
+        """The lazy form behaves like a QuickSearchForm."""
+        request = RequestFactory().get('/')
+        form = quick_search(request)['quick_search_form']
+        self.assertFalse(form.is_bound)
+        self.assertIn('quick_search', form.fields)
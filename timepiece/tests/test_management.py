@@ -1,7 +1,9 @@
 from dateutil.relativedelta import relativedelta
+import six
 
+from django.core.management import call_command
 from django.utils import timezone
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 
 from timepiece import utils
 from timepiece.management.commands import check_entries
@@ -196,3 +198,76 @@ class CheckEntries(TestCase):
                 self.assertEqual(
                     total_overlaps, num_days * len(self.all_users))
                 return
+
+    def testFindOverlapsMatchesPairwise(self):
+        """
+        find_overlaps should report the same pairs, in the same order, as
+        comparing every entry against every other entry.
+        """
+        now = timezone.now() - relativedelta(days=2)
+        # Overlapping, nested, touching, tied and open entries.
+        spans = [(0, 60), (30, 90), (40, 50), (90, 120), (120, 180),
+                 (150, 160), (150, 170), (200, None), (210, 220)]
+        for start, end in spans:
+            self.make_entry(
+                start_time=now + relativedelta(minutes=start),
+                end_time=now + relativedelta(minutes=end) if end else None)
+        # Break the tie in start times, as check_overlap is not symmetric.
+        entries = list(Entry.objects.filter(
+            user=self.user, start_time__gte=now).order_by('start_time', 'pk'))
+        expected = []
+        for index_a, entry_a in enumerate(entries):
+            for entry_b in entries[index_a:]:
+                if entry_a.check_overlap(entry_b):
+                    expected.append((entry_a, entry_b))
+        found = check_entries.Command().find_overlaps(entries)
+        self.assertEqual(found, expected)
+        self.assertEqual(len(found), 6)
+
+    def testFindEntriesSingleQuery(self):
+        """find_entries should fetch every user's entries in one query."""
+        start = check_entries.Command().find_start()
+        all_users = check_entries.Command().find_users()
+        with self.assertNumQueries(1):
+            entries = check_entries.Command().find_entries(all_users, start)
+            user_ids = [user_entries[0].user_id for user_entries in entries]
+        self.assertEqual(user_ids, sorted(u.pk for u in self.all_users))
+
+    def testHandleTotals(self):
+        """The command should report the overall number of overlaps."""
+        self.make_entry_bulk(self.all_users, 2)
+        out = six.StringIO()
+        call_command('check_entries', verbosity=1, stdout=out)
+        self.assertIn('Total overlapping entries: %d' % (2 * len(self.all_users)),
+                      out.getvalue())
+
+
+class CheckEntriesParallel(TransactionTestCase):
+
+    def setUp(self):
+        super(CheckEntriesParallel, self).setUp()
+        self.users = [factories.User() for i in range(4)]
+        self.project = factories.Project(
+            type__enable_timetracking=True, status__enable_timetracking=True)
+        now = timezone.now()
+        for user in self.users:
+            # Create one overlapping pair per day for each user.
+            for day in range(1, 4):
+                for minutes in (0, 5):
+                    start = now - relativedelta(days=day, minutes=30 - minutes)
+                    factories.Entry(
+                        user=user, project=self.project, status=Entry.VERIFIED,
+                        start_time=start, end_time=start + relativedelta(minutes=10))
+
+    def run_command(self, **kwargs):
+        out = six.StringIO()
+        call_command('check_entries', verbosity=2, stdout=out, **kwargs)
+        return out.getvalue()
+
+    def testWorkersMatchSerialOutput(self):
+        """Running with several workers should not change the output."""
+        serial = self.run_command()
+        parallel = self.run_command(workers=3)
+        self.assertEqual(parallel, serial)
+        expected = 'Total overlapping entries: %d' % (3 * len(self.users))
+        self.assertIn(expected, parallel)
@@ -1,11 +1,21 @@
 import datetime
 from decimal import Decimal
+import json
+import unittest
+
+import mock
 
 from django.test import TestCase
+from django.utils import timezone
 from timepiece.utils import get_active_entry, ActiveEntryError
+from timepiece.utils.csv import stream_csv
+from timepiece.utils.export import pyarrow, stream_arrow, stream_export
+from timepiece.utils.expressions import DateTrunc
 from timepiece.utils.views import format_totals
 from timepiece import utils
 
+from timepiece.entries.models import Entry
+
 from . import factories
 
 
@@ -54,6 +64,11 @@ class GetActiveEntryTest(TestCase):
         factories.Entry(start_time=now)
         self.assertEqual(entry, get_active_entry(self.user))
 
+    def test_get_active_entry_query_count(self):
+        factories.Entry(user=self.user, start_time=datetime.datetime.now())
+        with self.assertNumQueries(1):
+            get_active_entry(self.user)
+
     def test_get_active_entry_multiple(self):
         now = datetime.datetime.now()
         # two active entries for same user
@@ -85,3 +100,216 @@ class FormatTotalsTest(TestCase):
         self.assertEqual(entries[0]['smurf'], "{0:.2f}".format(60.50))
         self.assertEqual(entries[1]['smurf'], "{0:.2f}".format(30.75))
         self.assertEqual(entries[2]['smurf'], "{0:.2f}".format(20.20))
+
+
+class StreamCSVTest(TestCase):
+
+    def test_stream_csv(self):
+        response = stream_csv([['Name', 'Hours'], ['a, b', Decimal('1.50')]], 'report')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=report.csv')
+        content = b''.join(response.streaming_content)
+        self.assertEqual(content, b'Name,Hours\r\n"a, b",1.50\r\n')
+
+    def test_lazy(self):
+        """Rows are not produced until the response is consumed."""
+        consumed = []
+
+        def rows():
+            for i in range(3):
+                consumed.append(i)
+                yield [i]
+
+        response = stream_csv(rows(), 'report')
+        self.assertEqual(consumed, [])
+        self.assertEqual(next(iter(response.streaming_content)), b'0\r\n')
+        self.assertEqual(consumed, [0])
+
+
+class StreamExportTest(TestCase):
+
+    def setUp(self):
+        super(StreamExportTest, self).setUp()
+        self.rows = [
+            ['Name', 'Day', 'Hours'],
+            ['a', datetime.date(2016, 1, 4), Decimal('1.50')],
+            ['b', datetime.date(2016, 1, 5), ''],
+        ]
+
+    def test_csv(self):
+        response = stream_export(iter(self.rows), 'report', 'csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+    def test_unknown_format(self):
+        response = stream_export(iter(self.rows), 'report', 'xls')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+    def test_ndjson(self):
+        """Rows are keyed by the header, keeping numbers and nulls typed."""
+        response = stream_export(iter(self.rows), 'report', 'ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            response['Content-Disposition'], 'attachment; filename=report.ndjson')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual([json.loads(line) for line in content.splitlines()], [
+            {'Name': 'a', 'Day': '2016-01-04', 'Hours': 1.5},
+            {'Name': 'b', 'Day': '2016-01-05', 'Hours': None},
+        ])
+
+    def test_arrow_fallback(self):
+        """Arrow is exported as NDJSON when pyarrow is not installed."""
+        with mock.patch('timepiece.utils.export.pyarrow', None):
+            response = stream_export(iter(self.rows), 'report', 'arrow')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow(self):
+        response = stream_export(iter(self.rows), 'report', 'arrow')
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.apache.arrow.stream')
+        content = b''.join(response.streaming_content)
+        table = pyarrow.ipc.open_stream(content).read_all()
+        self.assertEqual(table.column_names, ['Name', 'Day', 'Hours'])
+        self.assertEqual(table.to_pydict()['Hours'], [1.5, None])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_batches(self):
+        """Columns blank in the first batch are typed by a later one."""
+        rows = [
+            ['Name', 'Day', 'Hours'],
+            ['a', datetime.date(2016, 1, 4), ''],
+            ['b', datetime.date(2016, 1, 5), ''],
+            ['c', datetime.date(2016, 1, 6), Decimal('1.50')],
+            ['d', datetime.date(2016, 1, 7), 2],
+            [3, datetime.date(2016, 1, 8), ''],
+        ]
+        response = stream_arrow(iter(rows), 'report', batch_size=2)
+        content = b''.join(response.streaming_content)
+        table = pyarrow.ipc.open_stream(content).read_all()
+        self.assertEqual(str(table.schema.field('Hours').type), 'double')
+        self.assertEqual(table.to_pydict()['Hours'], [None, None, 1.5, 2.0, None])
+        self.assertEqual(table.to_pydict()['Name'], ['a', 'b', 'c', 'd', '3'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_labels(self):
+        """Text in a column of numbers is left out, in any batch."""
+        rows = [
+            ['Name', 'Hours'],
+            ['a', Decimal('1.50')],
+            ['Total:', 'Total:'],
+            ['b', 2.5],
+            ['Total:', 'Total:'],
+        ]
+        response = stream_arrow(iter(rows), 'report', batch_size=2)
+        content = b''.join(response.streaming_content)
+        table = pyarrow.ipc.open_stream(content).read_all()
+        self.assertEqual(str(table.schema.field('Hours').type), 'double')
+        self.assertEqual(table.to_pydict()['Hours'], [1.5, None, 2.5, None])
+        self.assertEqual(table.to_pydict()['Name'], ['a', 'Total:', 'b', 'Total:'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_blank_column(self):
+        """A column with no values to type it by keeps later values as text."""
+        rows = [
+            ['Name', 'Note'],
+            ['a', ''],
+            ['b', 'late'],
+            ['c', Decimal('1.50')],
+        ]
+        with mock.patch('timepiece.utils.export.ARROW_TYPE_BATCHES', 1):
+            response = stream_arrow(iter(rows), 'report', batch_size=1)
+            content = b''.join(response.streaming_content)
+        table = pyarrow.ipc.open_stream(content).read_all()
+        self.assertEqual(str(table.schema.field('Note').type), 'string')
+        self.assertEqual(table.to_pydict()['Note'], [None, 'late', '1.5'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_other_values(self):
+        """Values which are not numbers do not break a column of numbers."""
+        rows = [
+            ['Hours'],
+            [Decimal('1.50')],
+            [datetime.date(2016, 1, 4)],
+        ]
+        response = stream_arrow(iter(rows), 'report', batch_size=1)
+        content = b''.join(response.streaming_content)
+        table = pyarrow.ipc.open_stream(content).read_all()
+        self.assertEqual(table.to_pydict()['Hours'], [1.5, None])
+
+
+class DateTruncTest(TestCase):
+    """
+    DateTrunc must produce the same buckets on every database backend, so
+    its results are checked against buckets computed in Python.
+    """
+    end_times = [
+        datetime.datetime(2011, 12, 31, 23, 59, 59),  # Saturday, end of year
+        datetime.datetime(2012, 1, 1, 0, 0, 0),  # Sunday, start of year
+        datetime.datetime(2012, 1, 2, 0, 0, 1),  # Monday
+        datetime.datetime(2012, 2, 29, 12, 30),  # Leap day
+        datetime.datetime(2012, 3, 4, 18, 0),  # Sunday
+        datetime.datetime(2012, 3, 5, 9, 15),  # Monday
+    ]
+
+    def setUp(self):
+        self.user = factories.User()
+        for end_time in self.end_times:
+            factories.Entry(
+                user=self.user, start_time=end_time - datetime.timedelta(hours=1),
+                end_time=end_time)
+
+    def expected(self, kind):
+        truncate = {
+            'day': lambda d: d.replace(hour=0, minute=0, second=0),
+            'week': lambda d: (d - datetime.timedelta(days=d.weekday())).replace(
+                hour=0, minute=0, second=0),
+            'month': lambda d: d.replace(day=1, hour=0, minute=0, second=0),
+            'year': lambda d: d.replace(month=1, day=1, hour=0, minute=0, second=0),
+        }[kind]
+        return [utils.add_timezone(truncate(d)) for d in self.end_times]
+
+    def bucket(self, kind):
+        entries = Entry.no_join.filter(user=self.user).order_by('end_time')
+        entries = entries.annotate(date=DateTrunc(kind, 'end_time'))
+        return [utils.add_timezone(d) for d in entries.values_list('date', flat=True)]
+
+    def test_day(self):
+        self.assertEqual(self.bucket('day'), self.expected('day'))
+
+    def test_week(self):
+        self.assertEqual(self.bucket('week'), self.expected('week'))
+
+    def test_month(self):
+        self.assertEqual(self.bucket('month'), self.expected('month'))
+
+    def test_year(self):
+        self.assertEqual(self.bucket('year'), self.expected('year'))
+
+    def test_invalid_kind(self):
+        self.assertRaises(ValueError, DateTrunc, 'fortnight', 'end_time')
+
+    def test_week_time_zone(self):
+        """An entry's week is the week of its day in the current time zone."""
+        with self.settings(USE_TZ=True, TIME_ZONE='America/Chicago'):
+            # Sunday evening in Chicago, but Monday in UTC.
+            end_time = timezone.make_aware(
+                datetime.datetime(2012, 3, 4, 21), timezone.get_current_timezone())
+            factories.Entry(
+                user=self.user, start_time=end_time - datetime.timedelta(hours=1),
+                end_time=end_time)
+            entries = Entry.no_join.filter(user=self.user, end_time=end_time)
+            entries = entries.annotate(
+                day=DateTrunc('day', 'end_time'), week=DateTrunc('week', 'end_time'))
+            day, week = entries.values_list('day', 'week').get()
+        self.assertEqual(day.date(), datetime.date(2012, 3, 4))
+        self.assertEqual(week.date(), datetime.date(2012, 2, 27))
+
+    def test_entry_date_trunc(self):
+        """Report rows are grouped by the truncated date."""
+        rows = Entry.objects.filter(user=self.user).date_trunc('week')
+        self.assertEqual(
+            [(utils.add_timezone(row['date']), row['hours']) for row in rows],
+            [(utils.add_timezone(datetime.datetime(2011, 12, 26)), 2),
+             (utils.add_timezone(datetime.datetime(2012, 1, 2)), 1),
+             (utils.add_timezone(datetime.datetime(2012, 2, 27)), 2),
+             (utils.add_timezone(datetime.datetime(2012, 3, 5)), 1)])
@@ -33,13 +33,12 @@ def get_active_entry(user, select_for_update=False):
     entries = apps.get_model('entries', 'Entry').no_join
     if select_for_update:
         entries = entries.select_for_update()
-    entries = entries.filter(user=user, end_time__isnull=True)
+    # Fetching a second entry is enough to tell there is more than one.
+    entries = list(entries.filter(user=user, end_time__isnull=True)[:2])
 
-    if not entries.exists():
-        return None
-    if entries.count() > 1:
+    if len(entries) > 1:
         raise ActiveEntryError('Only one active entry is allowed.')
-    return entries[0]
+    return entries[0] if entries else None
 
 
 def get_hours_summary(entries):
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+
+
+ACTIVE_ENTRIES = 'active-entries'
+DASHBOARD = 'dashboard'
+QUICK_CLOCK_IN = 'quick-clock-in'
+
+
+def _version_key(namespace):
+    return 'timepiece:{0}:version'.format(namespace)
+
+
+def get_version(namespace):
+    """Returns the current version of the cached values in the namespace."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = 1
+        cache.add(key, version, None)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidates every value cached in the namespace."""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:  # The version is not in the cache yet.
+        cache.set(key, get_version(namespace) + 1, None)
+
+
+def get_key(namespace):
+    """Returns the key of the value shared by everyone in the namespace."""
+    return 'timepiece:{0}:{1}'.format(namespace, get_version(namespace))
+
+
+def get_user_key(namespace, user_id):
+    """Returns the key of the user's value cached in the namespace."""
+    return 'timepiece:{0}:{1}:{2}'.format(
+        namespace, get_version(namespace), user_id)
+
+
+def _get_or_compute(key, compute):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value
+
+
+def get_value(namespace, compute):
+    """
+    Returns the value shared by everyone cached in the namespace, computing
+    and caching it if it is missing. Bump the namespace's version to
+    invalidate it.
+    """
+    return _get_or_compute(get_key(namespace), compute)
+
+
+def get_user_value(namespace, user_id, compute):
+    """
+    Returns the user's value cached in the namespace, computing and caching
+    it if it is missing.
+    """
+    return _get_or_compute(get_user_key(namespace, user_id), compute)
+
+
+def invalidate_user(namespace, user_id):
+    """Invalidates the user's value cached in the namespace."""
+    cache.delete(get_user_key(namespace, user_id))
@@ -4,7 +4,7 @@ import csv
 from decimal import Decimal
 from json import JSONEncoder
 
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 
 
 class DecimalEncoder(JSONEncoder):
@@ -15,21 +15,37 @@ class DecimalEncoder(JSONEncoder):
         return super(DecimalEncoder, self).default(obj)
 
 
+class Echo(object):
+    """A file-like object whose write returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, filename):
+    """
+    Returns a response which writes the rows as a CSV attachment as they are
+    consumed, so memory use does not grow with the size of the export.
+    """
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename=%s.csv' % filename
+    return response
+
+
 class CSVViewMixin(object):
 
     def render_to_response(self, context):
-        response = HttpResponse(content_type='text/csv')
-        fn = self.get_filename(context)
-        response['Content-Disposition'] = 'attachment; filename=%s.csv' % fn
         rows = self.convert_context_to_csv(context)
-        writer = csv.writer(response)
-        for row in rows:
-            writer.writerow(row)
-        return response
+        return stream_csv(rows, self.get_filename(context))
 
     def get_filename(self, context):
         raise NotImplemented('You must implement this in the subclass')
 
     def convert_context_to_csv(self, context):
-        """Convert the context dictionary into a CSV file."""
+        """
+        Convert the context dictionary into CSV rows. This may be a
+        generator, which is consumed as the response is streamed.
+        """
         raise NotImplemented('You must implement this in the subclass')
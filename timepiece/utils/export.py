@@ -0,0 +1,202 @@
+from __future__ import absolute_import
+
+import datetime
+from decimal import Decimal
+import io
+import itertools
+import json
+
+import six
+
+from django.http import StreamingHttpResponse
+
+from timepiece.utils.csv import CSVViewMixin, DecimalEncoder, stream_csv
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+EXPORT_FORMATS = ('csv', 'ndjson', 'arrow')
+
+# The most batches held back to find a value for each column to type it by.
+ARROW_TYPE_BATCHES = 10
+
+
+class ExportEncoder(DecimalEncoder):
+
+    def default(self, obj):
+        if isinstance(obj, (datetime.date, datetime.time)):
+            return obj.isoformat()
+        return super(ExportEncoder, self).default(obj)
+
+
+def round_hours(value):
+    """
+    Rounds hours to two places as a Decimal, which CSV writes as two
+    decimal places and the typed formats write as a number.
+    """
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def _typed(value):
+    """
+    Blank cells, which the CSV rows use for zero hours, become null, and
+    objects other than numbers, text and dates are written as text, as they
+    are in CSV.
+    """
+    if value == '':
+        return None
+    if isinstance(value, Decimal):
+        return float(value)
+    if value is None or isinstance(value, (
+            six.string_types, six.integer_types, float, datetime.date,
+            datetime.time)):
+        return value
+    return six.text_type(value)
+
+
+def _chunks(rows, size):
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _drain(sink):
+    value = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return value
+
+
+def _ndjson_lines(rows):
+    rows = iter(rows)
+    names = [str(name) for name in next(rows, [])]
+    for row in rows:
+        record = dict(zip(names, (_typed(value) for value in row)))
+        yield json.dumps(record, cls=ExportEncoder) + '\n'
+
+
+def _arrow_type(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        # Nothing to type the column by, so any later values are kept as text.
+        return pyarrow.string()
+    numbers = [value for value in values if not isinstance(value, six.string_types)]
+    if numbers and all(isinstance(value, six.integer_types + (float,))
+                       for value in numbers):
+        # Text in a column of numbers is a label, such as a totals row's,
+        # which is left out.
+        values = numbers
+    try:
+        arrow_type = pyarrow.array(values).type
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        # Text mixed with dates or other values.
+        return pyarrow.string()
+    if pyarrow.types.is_integer(arrow_type):
+        # Hours are summed from integers and decimals alike.
+        return pyarrow.float64()
+    return arrow_type
+
+
+def _arrow_value(value, arrow_type):
+    """Casts the value to the column's type, fixed by the first batches."""
+    if value is None:
+        return None
+    if pyarrow.types.is_floating(arrow_type):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            # A label, or another value, in a column of numbers.
+            return None
+    if pyarrow.types.is_string(arrow_type):
+        return six.text_type(value)
+    return value
+
+
+def _arrow_batches(rows, batch_size):
+    rows = iter(rows)
+    names = [str(name) for name in next(rows, [])]
+    chunks = _chunks(([_typed(value) for value in row] for row in rows), batch_size)
+    # Columns are typed by the first batches, held back until every column
+    # has a value or ARROW_TYPE_BATCHES have been read.
+    held = []
+    blank = set(range(len(names)))
+    for chunk in chunks:
+        held.append(chunk)
+        for row in chunk:
+            blank.difference_update(
+                index for index, value in enumerate(row) if value is not None)
+        if not blank or len(held) >= ARROW_TYPE_BATCHES:
+            break
+    columns = list(zip(*[row for chunk in held for row in chunk]))
+    types = [_arrow_type(column) for column in columns] or [pyarrow.string()] * len(names)
+    sink = io.BytesIO()
+    writer = pyarrow.RecordBatchStreamWriter(sink, pyarrow.schema(list(zip(names, types))))
+    for chunk in itertools.chain(held, chunks):
+        columns = zip(*chunk)
+        arrays = [pyarrow.array([_arrow_value(value, arrow_type) for value in column],
+                                type=arrow_type)
+                  for column, arrow_type in zip(columns, types)]
+        writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, names))
+        yield _drain(sink)
+    writer.close()
+    yield _drain(sink)
+
+
+def stream_ndjson(rows, filename):
+    """
+    Returns a response which writes CSV-style rows (a header followed by
+    values) as newline delimited JSON objects keyed by the header. Numbers
+    stay numbers and blank cells are null, so the output can be loaded
+    without re-parsing every column.
+    """
+    response = StreamingHttpResponse(
+        _ndjson_lines(rows), content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename=%s.ndjson' % filename
+    return response
+
+
+def stream_arrow(rows, filename, batch_size=10000):
+    """
+    Returns a response which writes CSV-style rows in the Arrow IPC
+    streaming format, one record batch per ``batch_size`` rows. Column types
+    are taken from the first batches which have a value in every column;
+    text in columns of numbers is a label which is left out, and columns
+    mixing text with other values, or with no values, are text. Later
+    batches are cast to them. Requires pyarrow.
+    """
+    response = StreamingHttpResponse(
+        _arrow_batches(rows, batch_size),
+        content_type='application/vnd.apache.arrow.stream')
+    response['Content-Disposition'] = 'attachment; filename=%s.arrow' % filename
+    return response
+
+
+def stream_export(rows, filename, export_format='csv'):
+    """
+    Streams the rows in one of ``EXPORT_FORMATS``. Arrow falls back to
+    NDJSON when pyarrow is not installed; unknown formats fall back to CSV.
+    """
+    if export_format == 'arrow':
+        if pyarrow is not None:
+            return stream_arrow(rows, filename)
+        export_format = 'ndjson'
+    if export_format == 'ndjson':
+        return stream_ndjson(rows, filename)
+    return stream_csv(rows, filename)
+
+
+class ExportViewMixin(CSVViewMixin):
+    """
+    Exports the rows from ``convert_context_to_csv`` in the format named by
+    the ``format`` GET parameter, defaulting to CSV.
+    """
+
+    def render_to_response(self, context):
+        rows = self.convert_context_to_csv(context)
+        export_format = self.request.GET.get('format', 'csv')
+        return stream_export(rows, self.get_filename(context), export_format)
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db.models import DateTimeField
+from django.db.models.expressions import Func
+from django.utils import timezone
+
+
+class DateTrunc(Func):
+    """
+    Truncates a datetime to the start of its day, week, month or year.
+
+    Weeks start on Monday. The same buckets are produced on PostgreSQL,
+    SQLite, MySQL and Oracle; day, month and year use the backend's own
+    truncation, while week is built from a per-backend template applied to
+    the day. As for the other kinds, the day is taken in the current time
+    zone when USE_TZ is set, so an entry is in the week of its day.
+    """
+    kinds = ('day', 'week', 'month', 'year')
+    week_templates = {
+        'postgresql': "DATE_TRUNC('week', {expression})",
+        'sqlite': "DATETIME(DATE({expression}), '-6 days', 'weekday 1')",
+        'mysql': ("CAST(DATE_FORMAT({expression} - INTERVAL WEEKDAY({expression}) DAY, "
+                  "'%%Y-%%m-%%d 00:00:00') AS DATETIME)"),
+        'oracle': "TRUNC({expression}, 'IW')",
+    }
+
+    def __init__(self, kind, expression, **extra):
+        if kind not in self.kinds:
+            raise ValueError('kind must be one of: {0}'.format(', '.join(self.kinds)))
+        extra.setdefault('output_field', DateTimeField())
+        super(DateTrunc, self).__init__(expression, **extra)
+        self.kind = kind
+
+    def as_sql(self, compiler, connection):
+        connection.ops.check_expression_support(self)
+        sql, params = compiler.compile(self.source_expressions[0])
+        params = list(params)
+        tzname = timezone.get_current_timezone_name() if settings.USE_TZ else None
+        if self.kind == 'week':
+            try:
+                template = self.week_templates[connection.vendor]
+            except KeyError:
+                raise NotImplementedError(
+                    'Truncating to weeks is not supported on {0}.'.format(connection.vendor))
+            sql, trunc_params = connection.ops.datetime_trunc_sql('day', sql, tzname)
+            params += list(trunc_params)
+            return (template.format(expression=sql),
+                    params * template.count('{expression}'))
+        sql, trunc_params = connection.ops.datetime_trunc_sql(self.kind, sql, tzname)
+        return sql, params + list(trunc_params)